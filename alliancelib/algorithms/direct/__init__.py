@@ -3,3 +3,4 @@ Direct Algorithms
 """
 import alliancelib.algorithms.direct.solution_size
 import alliancelib.algorithms.direct.minimal
+from alliancelib.algorithms.direct.enumeration import *
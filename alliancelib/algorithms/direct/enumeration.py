@@ -0,0 +1,194 @@
+# pylint: disable=C0103,R0913
+"""
+Enumerates every Globally Minimal Defensive Alliance in a graph.
+
+Starting from the threshold core, each alliance in the frontier has one vertex
+removed at a time and is reduced back to the largest alliance left.
+If every removal leaves nothing, it is minimal, otherwise what is left is
+added to the next frontier.
+Every minimal alliance inside a set survives removing a vertex outside it, so
+this reaches all of them.
+
+The frontier is split between a pool of worker processes, which attach to
+the graph through shared memory.
+Sets are deduplicated by fingerprint in a table all the workers share, so a
+set reached from many parents is only expanded once (or a few times, if it
+was evicted from the table in between).
+Minimal alliances are yielded as soon as they are confirmed.
+"""
+import multiprocessing as mp
+from typing import Iterator, List, Optional, Tuple
+
+from alliancelib.ds import Graph, NodeId, VertexSet
+from alliancelib.ds.shared import publish_graph, attach_graph
+from alliancelib.ds.vertex_set import Validation
+from alliancelib.ds.alliances.common import threshold_core
+from alliancelib.ds.alliances.da import defensive_alliance_thresholds
+from alliancelib.ds.alliances.gmda import \
+    GloballyMinimalDefensiveAlliance, \
+    reduced_subsets
+from alliancelib.ds.alliances.conversion import convert_to_gmda
+from alliancelib.algorithms.direct.solution_size.transposition import \
+    TranspositionTable, \
+    SharedTranspositionTable, \
+    set_fingerprint
+
+# the set, if it is minimal, the sets left by each removal, and how many of
+# those were skipped as duplicates.
+Expansion = Tuple[Tuple[NodeId, ...], bool, List[Tuple[NodeId, ...]], int]
+
+
+class EnumerationStatistics:
+    """
+    Progress counters for `enumerate_gmdas`.
+
+    `expanded` is the number of sets expanded, `duplicates` the number of
+    sets skipped as they were already reached, `found` the number of minimal
+    alliances yielded, and `frontier` the number of sets left in the current
+    `level`.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.duplicates = 0
+        self.found = 0
+        self.frontier = 0
+        self.level = 0
+
+    def __str__(self) -> str:
+        return f'level={self.level} frontier={self.frontier} ' + \
+            f'expanded={self.expanded} duplicates={self.duplicates} ' + \
+            f'found={self.found}'
+
+
+class _Expander:
+    """
+    Expands a set, in whichever process has the graph.
+    """
+
+    def __init__(self, graph: Graph, r: int, table):
+        self.graph = graph
+        self.thresholds = defensive_alliance_thresholds(graph, r)
+        self.table = table
+
+    def __call__(self, nodes: Tuple[NodeId, ...]) -> Expansion:
+        children = []
+        duplicates = 0
+        minimal = True
+        for _, res in reduced_subsets(self.graph, self.thresholds, nodes):
+            if not res:
+                continue
+            minimal = False
+            fingerprint = set_fingerprint(res)
+            if self.table.explored(fingerprint, 0):
+                duplicates += 1
+                continue
+            self.table.store(fingerprint, 0)
+            children.append(tuple(res))
+        return (nodes, minimal, children, duplicates)
+
+
+_expander: Optional[_Expander] = None
+
+
+def _init_worker(handle, r: int, table, counter) -> None:
+    # pylint: disable=W0603
+    global _expander
+    with counter.get_lock():
+        table.bind(counter.value)
+        counter.value += 1
+    _expander = _Expander(attach_graph(handle), r, table)
+
+
+def _expand(nodes: Tuple[NodeId, ...]) -> Expansion:
+    return _expander(nodes)
+
+
+def enumerate_gmdas(graph: Graph,
+                    r: int = -1,
+                    max_size: Optional[int] = None,
+                    workers: int = 1,
+                    stats: Optional[EnumerationStatistics] = None,
+                    table_size: int = 1 << 20
+                    ) -> Iterator[GloballyMinimalDefensiveAlliance]:
+    """
+    Yield every Globally Minimal Defensive Alliance in `graph` once, or only
+    those with at most `max_size` vertices.
+
+    The frontier is expanded by `workers` processes (or in this one, if
+    there is only one), and `stats` is kept up to date as it goes.
+    Sets are deduplicated with a table of `table_size` fingerprints.
+    """
+    if stats is None:
+        stats = EnumerationStatistics()
+    workers = max(1, workers)
+
+    thresholds = defensive_alliance_thresholds(graph, r)
+    core = threshold_core(graph, thresholds, set(graph.nodes()))
+    if not core:
+        return
+
+    shared = None
+    pool = None
+    if workers > 1:
+        ctx = mp.get_context('fork')
+        shared = publish_graph(graph)
+        table = SharedTranspositionTable(table_size, workers=workers)
+        pool = ctx.Pool(
+            workers, _init_worker,
+            (shared.handle(), r, table, ctx.Value('i', 0))
+        )
+    else:
+        table = TranspositionTable(table_size)
+        local = _Expander(graph, r, table)
+
+    table.store(set_fingerprint(core), 0)
+    # minimal sets can be reached again after being evicted from the table.
+    emitted = set()
+    frontier: List[Tuple[NodeId, ...]] = [tuple(core)]
+
+    try:
+        while frontier:
+            stats.level += 1
+            stats.frontier = len(frontier)
+            if pool is not None:
+                level = pool.imap_unordered(
+                    _expand, frontier,
+                    max(1, len(frontier) // (8 * workers))
+                )
+            else:
+                level = map(local, frontier)
+            following: List[Tuple[NodeId, ...]] = []
+
+            for nodes, minimal, children, duplicates in level:
+                stats.expanded += 1
+                stats.frontier -= 1
+                stats.duplicates += duplicates
+                following.extend(children)
+                if not minimal:
+                    continue
+                if max_size is not None and len(nodes) > max_size:
+                    continue
+                members = frozenset(nodes)
+                if members in emitted:
+                    continue
+                emitted.add(members)
+                stats.found += 1
+                # each removal was checked to leave no alliance.
+                yield convert_to_gmda(
+                    VertexSet(graph, set(nodes)), r, Validation.TRUSTED
+                )
+
+            frontier = following
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if shared is not None:
+            shared.close()
+
+
+__all__ = [
+    'EnumerationStatistics',
+    'enumerate_gmdas'
+]
@@ -3,55 +3,136 @@
 This is a algorithm that removes vertices to try and find proper subsets that
 can't be further reduced.
 
-This is exponetial time, so it can't be ran on anything too large but is useful
-to verify gadgets.
+Each step removes one vertex and reduces what is left to the largest alliance
+in it, until no removal leaves an alliance.
+Reduced sets are remembered, so the many ways of reaching the same set only
+explore it once, and randomised restarts can share what they have explored to
+each find a different minimal alliance.
 """
 import random
-from itertools import combinations
 
-from typing import Optional
-from alliancelib.ds import Graph, NodeId, NodeSet, VertexSet
+from collections.abc import Mapping
+from typing import Callable, List, Optional
+from alliancelib.ds import Graph, NodeSet, VertexSet
+from alliancelib.ds.vertex_set import Validation
 
 from alliancelib.ds.alliances.gmda import \
     GloballyMinimalDefensiveAlliance, \
-    chisel
-from alliancelib.ds.alliances.da import da_is_protected
+    chisel, \
+    removal_cascade
+from alliancelib.ds.alliances.da import \
+    DefensiveAlliance, \
+    defensive_alliance_thresholds
 from alliancelib.ds.alliances.conversion import convert_to_gmda
-from alliancelib.ds.alliances.common import ProtectionFunction
+from alliancelib.ds.alliances.common import \
+    ProtectionFunction, \
+    neighbours_in_set_count, \
+    threshold_core
+from alliancelib.algorithms.utils.twins import TwinClasses, twin_classes
+from alliancelib.algorithms.direct.solution_size.common import \
+    SearchStatistics
+from alliancelib.algorithms.direct.solution_size.transposition import \
+    TranspositionTable, \
+    set_fingerprint
 
+# Maps a set of vertices to the largest alliance contained in it.
+ReduceFunction = Callable[[NodeSet], NodeSet]
 
-def find_minimal_rec(graph: Graph,
-                     protected: ProtectionFunction,
-                     nodes: NodeSet
-                     ) -> Optional[VertexSet]:
+_DONE = object()
+
+
+def find_minimal_reduce(graph: Graph,
+                        reduce: ReduceFunction,
+                        nodes: NodeSet,
+                        twins: Optional[TwinClasses] = None,
+                        stats: Optional[SearchStatistics] = None,
+                        table: Optional[TranspositionTable] = None,
+                        rng: Optional[random.Random] = None
+                        ) -> Optional[VertexSet]:
     """
-    Recursive, but this algorithm is completely unsuited to cases where you
-    would hit 1000 layers deep.
+    Depth first search for a minimal set, removing a vertex and reducing what
+    is left until every removal reduces to nothing.
+
+    Each reduced set is fingerprinted into `table`, and isn't explored again
+    if it is reached from another parent, or by another search sharing the
+    table, so the search can fail if everything below `nodes` was already
+    explored.
+    Removals are tried lazily in a random order, from `rng` if given.
 
-    The heat death of the universe will occur sooner than this returning in
-    those cases.
+    With `twins`, only one vertex of each twin class is tried removing at
+    each level, as removing another gives the same subproblem up to swapping
+    them, which `reduce` must respect.
+    Reductions tried, repeats skipped and twin removals skipped are counted
+    in `stats`.
     """
-    hit = False
+    if table is None:
+        table = TranspositionTable()
+    shuffle = rng.shuffle if rng is not None else random.shuffle
 
-    # randomize this so repeated iterations can potentially find different
-    # alliances quickly.
-    combos = list(combinations(nodes, len(nodes) - 1))
-    random.shuffle(combos)
+    def frame(ns: NodeSet) -> List:
+        # randomize this so repeated iterations can potentially find
+        # different alliances quickly.
+        removals = list(ns)
+        shuffle(removals)
+        # [set, removals left to try, if any removal left an alliance,
+        # twin classes tried]
+        return [ns, iter(removals), False, set()]
 
-    for attempt in combos:
-        res = chisel(graph, protected, set(attempt))
-        if res != set():
-            hit = True
-            vs = find_minimal_rec(graph, protected, res)
-            if vs:
-                return vs
+    nodes = set(nodes)
+    table.store(set_fingerprint(nodes), 0)
+    stack = [frame(nodes)]
+    while stack:
+        top = stack[-1]
+        vertex = next(top[1], _DONE)
+        if vertex is _DONE:
+            stack.pop()
+            if not top[2]:
+                return VertexSet(graph, top[0])
+            continue
 
-    if not hit:
-        return VertexSet(graph, nodes)
+        if twins is not None:
+            if twins[vertex] in top[3]:
+                if stats is not None:
+                    stats.twins += 1
+                continue
+            top[3].add(twins[vertex])
+
+        if stats is not None:
+            stats.visited += 1
+        res = reduce(top[0] - {vertex})
+        if not res:
+            continue
+
+        # so this set isn't minimal, even if `res` was explored before.
+        top[2] = True
+        fingerprint = set_fingerprint(res)
+        if table.explored(fingerprint, 0):
+            if stats is not None:
+                stats.skipped += 1
+            continue
+        table.store(fingerprint, 0)
+        stack.append(frame(res))
 
     return None
 
 
+def find_minimal_rec(graph: Graph,
+                     protected: ProtectionFunction,
+                     nodes: NodeSet,
+                     twins: Optional[TwinClasses] = None,
+                     stats: Optional[SearchStatistics] = None
+                     ) -> Optional[VertexSet]:
+    """
+    Find a minimal alliance in `nodes`, using `chisel` to reduce each subset.
+
+    `twins` should only be passed if `protected` treats twins the same way.
+    """
+    def reduce(ns: NodeSet) -> NodeSet:
+        return chisel(graph, protected, ns)
+
+    return find_minimal_reduce(graph, reduce, nodes, twins, stats)
+
+
 def find_minimal(graph: Graph,
                  protected: ProtectionFunction
                  ) -> Optional[VertexSet]:
@@ -62,15 +143,152 @@ def find_minimal(graph: Graph,
 
 
 def find_gmda(graph: Graph,
-              r: int = -1
+              r: int = -1,
+              twins: bool = False,
+              stats: Optional[SearchStatistics] = None
               ) -> Optional[GloballyMinimalDefensiveAlliance]:
     """
     Find a Globally Minimal Defensive Alliance
+
+    With `twins`, only one of each class of twin vertices is tried removing
+    at each level.
     """
-    def protection_function(g: Graph, n: NodeId, ns: NodeSet):
-        return da_is_protected(g, n, ns, r)
+    thresholds = defensive_alliance_thresholds(graph, r)
 
-    res = find_minimal(graph, protection_function)
+    def reduce(ns: NodeSet) -> NodeSet:
+        return threshold_core(graph, thresholds, ns)
+
+    core = reduce(set(graph.nodes()))
+    if not core:
+        return None
+
+    res = find_minimal_reduce(
+        graph, reduce, core, twin_classes(graph) if twins else None, stats
+    )
     if res:
-        return convert_to_gmda(res)
+        return convert_to_gmda(res, r)
     return None
+
+
+def find_gmdas(graph: Graph,
+               r: int = -1,
+               restarts: int = 8,
+               seed: Optional[int] = None,
+               twins: bool = False,
+               stats: Optional[SearchStatistics] = None
+               ) -> List[GloballyMinimalDefensiveAlliance]:
+    """
+    Find up to `restarts` different Globally Minimal Defensive Alliances.
+
+    Each restart searches from the threshold core in a new random order,
+    sharing the table of sets already entered with the others, so it can only
+    finish at a GMDA that none of them found.
+    Stops early once a restart finds nothing new.
+    """
+    thresholds = defensive_alliance_thresholds(graph, r)
+
+    def reduce(ns: NodeSet) -> NodeSet:
+        return threshold_core(graph, thresholds, ns)
+
+    core = reduce(set(graph.nodes()))
+    if not core:
+        return []
+
+    rng = random.Random(seed)
+    table = TranspositionTable()
+    classes = twin_classes(graph) if twins else None
+
+    res = []
+    for _ in range(restarts):
+        found = find_minimal_reduce(
+            graph, reduce, core, classes, stats, table, rng
+        )
+        if found is None:
+            break
+        res.append(convert_to_gmda(found, r))
+    return res
+
+
+def shrink_to_minimal(graph: Graph,
+                      thresholds: Mapping,
+                      nodes: NodeSet,
+                      stats: Optional[SearchStatistics] = None,
+                      rng: Optional[random.Random] = None
+                      ) -> NodeSet:
+    """
+    Greedily shrink an alliance to a minimal one inside it.
+
+    Tries removing each vertex once, keeping the removal (and whatever it
+    leaves unprotected) if the rest is still a non-empty alliance.
+    If removing a vertex leaves nothing, it does for any subset as well, so
+    one pass is enough, and as every proper sub-alliance survives removing
+    some vertex, the result is Globally Minimal, not just Locally Minimal.
+
+    Neighbour counts are kept up to date as vertices go, so an attempt only
+    costs the degrees of the vertices it peels.
+    Vertices are tried in a random order if `rng` is given.
+    """
+    members = set(nodes)
+    counts = {
+        vertex: neighbours_in_set_count(graph, vertex, members)
+        for vertex in members
+    }
+
+    def remove(doomed: NodeSet) -> None:
+        for vertex in doomed:
+            for neighbour in graph.neighbors(vertex):
+                if neighbour in members and neighbour not in doomed:
+                    counts[neighbour] -= 1
+        members.difference_update(doomed)
+
+    # in case it wasn't an alliance to start with.
+    remove(removal_cascade(graph, thresholds, members, counts, {
+        vertex for vertex in members if counts[vertex] < thresholds[vertex]
+    }))
+
+    order = list(members)
+    if rng is not None:
+        rng.shuffle(order)
+
+    for start in order:
+        if start not in members:
+            continue
+        if stats is not None:
+            stats.visited += 1
+        doomed = removal_cascade(graph, thresholds, members, counts, {start})
+        if len(doomed) < len(members):
+            remove(doomed)
+
+    return members
+
+
+def minimise_alliance(alliance: DefensiveAlliance,
+                      restarts: int = 0,
+                      seed: Optional[int] = None,
+                      stats: Optional[SearchStatistics] = None
+                      ) -> GloballyMinimalDefensiveAlliance:
+    """
+    Shrink an alliance found by any solver to a Globally Minimal Defensive
+    Alliance inside it, with `shrink_to_minimal`.
+
+    That is already minimal, but there can be smaller minimal alliances
+    inside `alliance`, so with `restarts`, it is shrunk that many more times
+    trying vertices in a random order, and the smallest result is kept.
+    """
+    graph = alliance.graph()
+    thresholds = alliance.thresholds()
+
+    best = shrink_to_minimal(graph, thresholds, alliance.vertices(), stats)
+
+    rng = random.Random(seed)
+    for _ in range(restarts):
+        res = shrink_to_minimal(
+            graph, thresholds, alliance.vertices(), stats, rng
+        )
+        if len(res) < len(best):
+            best = res
+
+    # nothing can be removed from it, so it is already known to be minimal.
+    return convert_to_gmda(
+        VertexSet(graph, best), alliance.r(), Validation.TRUSTED
+    )
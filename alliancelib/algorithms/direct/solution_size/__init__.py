@@ -3,4 +3,8 @@ Solution Size based algorithms.
 """
 from .common import *
 from .base import *
+from .canonical import *
+from .parallel import *
+from .transposition import *
 from .defensive_alliance import *
+from .local import *
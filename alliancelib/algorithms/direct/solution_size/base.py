@@ -7,12 +7,23 @@ This is because you can ignore vertices that would add too many neighbours,
 caping the total number of vertices to consider.
 """
 import multiprocessing as mp
-from typing import Optional, List
+import time
+from typing import Optional, List, Sequence
 from alliancelib.ds import \
     Graph, \
+    NodeId, \
     NodeSet, \
     VertexSet
-from .common import VertexPredicate, SolutionPredicate
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+from alliancelib.algorithms.utils.twins import TwinClasses
+from .common import \
+    VertexPredicate, \
+    SolutionPredicate, \
+    BoundFunction, \
+    SearchStatistics
+from .canonical import canonical_traverse
+from .parallel import POLL_INTERVAL
+from .transposition import set_fingerprint
 
 
 def traverse(graph: Graph,
@@ -20,12 +31,25 @@ def traverse(graph: Graph,
              possible_vertices: NodeSet,
              vertex_predicate: VertexPredicate,
              solution_predicate: SolutionPredicate,
-             depth: int
+             depth: int,
+             table=None,
+             scope: int = 0
              ) -> Optional[VertexSet]:
     """
     Recursive function, as thats the cleanest way of writing this, and you'll
     never actually hit the python stack limit of ~1000.
+
+    `table` is an optional transposition table, used to skip sets whose
+    subtree has already failed.
+    Sets are only stored once their whole subtree has been searched, under
+    `scope`, which should identify the predicates (see `scope_fingerprint`).
     """
+    fingerprint = None
+    if table is not None and initial_set:
+        fingerprint = set_fingerprint(initial_set, scope)
+        if table.explored(fingerprint, depth):
+            return None
+
     if solution_predicate(graph, initial_set):
         return VertexSet(graph, initial_set)
 
@@ -56,34 +80,48 @@ def traverse(graph: Graph,
             possible_vertices - vs,
             vertex_predicate,
             solution_predicate,
-            depth - 1
+            depth - 1,
+            table,
+            scope
         )
         if res:
             return res
 
+    if fingerprint is not None:
+        table.store(fingerprint, depth)
+
     return None
 
 
 def alliance_solution_size(graph: Graph,
                            vertex_predicate: VertexPredicate,
                            solution_predicate: SolutionPredicate,
-                           k: int
+                           k: int,
+                           roots: Optional[Sequence[NodeId]] = None,
+                           state: Optional[IncrementalAlliance] = None,
+                           bound: Optional[BoundFunction] = None,
+                           stats: Optional[SearchStatistics] = None,
+                           twins: Optional[TwinClasses] = None
                            ) -> Optional[VertexSet]:
     """
     Finds a connected alliance, up to a certain size.
-    """
-    # first, find the vertices that satify the predicate.
-    possible_vertices = set(
-        filter(lambda v: vertex_predicate(graph, v, k), graph.nodes())
-    )
 
-    return traverse(
+    Uses the canonical extension search, so each candidate is checked once.
+    If `state` is given, it is used instead of the solution predicate, and
+    `bound` can prune branches with it.
+    Counters are written to `stats` if one is passed.
+    `twins` maps vertices to twin classes, to only branch on one of each.
+    """
+    return canonical_traverse(
         graph,
-        set(),
-        possible_vertices,
+        roots,
         vertex_predicate,
         solution_predicate,
-        k
+        k,
+        state,
+        bound,
+        stats,
+        twins
     )
 
 
@@ -111,14 +149,39 @@ def new_sets(graph: Graph, base: List, k: int,
     return res
 
 
-def alliance_solution_size_parallel(graph: Graph,
-                                    initial: List,
-                                    vertex_predicate: VertexPredicate,
-                                    solution_predicate: SolutionPredicate,
-                                    k: int,
-                                    threads: int = 1
-                                    ) -> Optional[VertexSet]:
-    work_queue = mp.JoinableQueue()
+def alliance_solution_size_parallel_bfs(graph: Graph,
+                                        initial: List,
+                                        vertex_predicate: VertexPredicate,
+                                        solution_predicate: SolutionPredicate,
+                                        k: int,
+                                        threads: int = 1,
+                                        table=None
+                                        ) -> Optional[VertexSet]:
+    """
+    Breadth first search for a connected alliance, split between `threads`
+    processes.
+
+    The queue can grow exponentially with `k`, so prefer
+    `alliance_solution_size_parallel`.
+
+    `table` is an optional SharedTranspositionTable, so a set reached by more
+    than one path is only expanded once, by whichever worker got it first.
+    It needs a statistics slot for each of the `threads` workers.
+    Its entries mark sets claimed by a worker, not sets known to have no
+    solution under them, so it is cleared before the search starts.
+
+    Raises RuntimeError if a worker exits before the search is done.
+    """
+    if table is not None:
+        if table.workers < threads:
+            raise ValueError(
+                f'table has {table.workers} worker slots, need {threads}'
+            )
+        table.clear()
+
+    work_queue = mp.Queue()
+    # sets queued or being expanded, so the search is done once it is 0.
+    pending = mp.Value('i', len(initial))
 
     manager = mp.Manager()
     state = manager.dict()
@@ -129,27 +192,43 @@ def alliance_solution_size_parallel(graph: Graph,
     # using shared memory for this, so make it faster.
     found_state = mp.Value('b', False)
 
+    def expand(q, fs, item, return_dict):
+        # just clear the queue if we are done
+        if fs.value:
+            return
+
+        if table is not None:
+            fingerprint = set_fingerprint(item)
+            if table.explored(fingerprint, k - len(item)):
+                return
+            table.store(fingerprint, k - len(item))
+
+        if solution_predicate(graph, item):
+            fs.value = True
+            return_dict['found'] = True
+            return_dict['solution'] = item
+            return_dict['size'] = len(item)
+
+        if len(item) < k:
+            neighbours = new_sets(graph, item, k, vertex_predicate)
+            # counted before this set is marked done, so pending can't
+            # reach 0 while there is still work.
+            with pending.get_lock():
+                pending.value += len(neighbours)
+            for neighbour in neighbours:
+                q.put(neighbour)
+
     def worker(q, fs, idx, return_dict):
+        if table is not None:
+            table.bind(idx)
+
         while True:
             item = q.get()
-
-            # just clear the queue if we are done
-            if fs.value:
-                q.task_done()
-                continue
-
-            if solution_predicate(graph, item):
-                fs.value = True
-                return_dict['found'] = True
-                return_dict['solution'] = item
-                return_dict['size'] = len(item)
-
-            if len(item) < k:
-                neighbours = new_sets(graph, item, k, vertex_predicate)
-                for neighbour in neighbours:
-                    q.put(neighbour)
-
-            q.task_done()
+            # if this raises, pending stays above 0 and the worker exits,
+            # which the parent notices.
+            expand(q, fs, item, return_dict)
+            with pending.get_lock():
+                pending.value -= 1
 
     processes = []
     for i in range(threads):
@@ -162,15 +241,30 @@ def alliance_solution_size_parallel(graph: Graph,
     for item in initial:
         work_queue.put([item])
 
-    work_queue.join()
-
-    if state['found']:
-        return VertexSet(graph, state['solution'])
+    try:
+        while pending.value > 0:
+            time.sleep(POLL_INTERVAL)
+            if any(p.exitcode is not None for p in processes):
+                raise RuntimeError('a search worker exited early')
+        found = state['found']
+        solution = state['solution']
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.join()
+        # the queue is abandoned, and if a worker failed nothing will read
+        # what is left in it, so don't wait for it to be flushed on exit.
+        work_queue.cancel_join_thread()
+        manager.shutdown()
+
+    if found:
+        return VertexSet(graph, solution)
 
     return None
 
 
 __all__ = [
     'alliance_solution_size',
-    'alliance_solution_size_parallel'
+    'alliance_solution_size_parallel_bfs'
 ]
@@ -0,0 +1,423 @@
+# pylint: disable=C0103,R0913
+"""
+Canonical extension search for connected sets, up to a certain size.
+
+`traverse` grows a set by trying every eligible neighbour, so a connected set
+of size k can be reached along up to k! different paths, each of which runs
+the solution predicate again.
+
+This uses the ESU algorithm (Wernicke, 2006) instead.
+The roots are given an order, and a set is only ever grown from its earliest
+root.
+Each step picks a vertex from the extension set, and only adds the neighbours
+of it that are not already in or next to the current set to the extension set
+passed down.
+This means every connected set is visited exactly once.
+
+As a set is only reached along one path, the vertex predicate is always called
+with the full size `k` rather than the remaining depth, so it can't prune a
+vertex that another ordering would have allowed.
+
+If an IncrementalAlliance is passed in as `state`, it is carried down the
+recursion and undone on backtrack, so each step costs O(deg(v)) and checking
+for a solution is O(1) instead of calling the solution predicate.
+A `bound` can then be used to prune branches that can't be completed in the
+remaining depth.
+
+With `remember`, the search keeps the sets whose whole subtree was explored
+without being cut short by the size limit or the bound.
+Those subtrees hold no solution at any size, so searching again with a larger
+limit, as `minimum_defensive_alliance` does, skips them.
+Only the topmost such sets are kept.
+
+With `twins`, a mapping of vertices to twin classes (see
+`alliancelib.algorithms.utils.twins`), only one vertex of each class is
+branched on at each step, as the subtrees of the others are the same up to
+swapping them.
+The predicates and thresholds must treat twins the same way for this to be
+exact.
+
+`solutions` carries on past the first solution and yields every one it
+visits, as a generator, so nothing but the current path is held in memory.
+"""
+from typing import \
+    Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Set
+from alliancelib.ds import \
+    Graph, \
+    NodeId, \
+    NodeSet, \
+    VertexSet
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+from alliancelib.algorithms.utils.twins import TwinClasses
+from .common import \
+    VertexPredicate, \
+    SolutionPredicate, \
+    BoundFunction, \
+    SearchStatistics
+
+
+class CanonicalSearch:
+    """
+    Visits each connected set of at most `k` eligible vertices, that contains
+    at least one root, exactly once.
+    """
+
+    def __init__(self,
+                 graph: Graph,
+                 vertex_predicate: VertexPredicate,
+                 solution_predicate: SolutionPredicate,
+                 k: int,
+                 roots: Optional[Sequence[NodeId]] = None,
+                 state: Optional[IncrementalAlliance] = None,
+                 bound: Optional[BoundFunction] = None,
+                 stats: Optional[SearchStatistics] = None,
+                 remember: bool = False,
+                 twins: Optional[TwinClasses] = None):
+        if bound is not None and state is None:
+            raise ValueError('a bound needs a state to be checked against')
+
+        self.graph = graph
+        self.vertex_predicate = vertex_predicate
+        self.solution_predicate = solution_predicate
+        self.k = k
+        self.state = state
+        self.bound = bound
+        self.stats = stats if stats is not None else SearchStatistics()
+
+        self.eligible: Set[NodeId] = set(
+            filter(lambda v: vertex_predicate(graph, v, k), graph.nodes())
+        )
+
+        if roots is None:
+            roots = graph.nodes()
+        self.roots: List[NodeId] = [v for v in roots if v in self.eligible]
+
+        # vertices that aren't roots rank after all of them, so can be added
+        # to a set grown from any root.
+        self.rank: Dict[NodeId, int] = {
+            v: idx for idx, v in enumerate(self.roots)
+        }
+        self.after = len(self.roots)
+
+        self.twins = twins
+        # only the first root of each twin class is searched from.
+        self.representatives: List[NodeId] = self.roots
+        if twins is not None:
+            classes: Set[int] = set()
+            self.representatives = []
+            for v in self.roots:
+                if twins[v] not in classes:
+                    classes.add(twins[v])
+                    self.representatives.append(v)
+        self._representative_set = set(self.representatives)
+
+        self.remember = remember
+        self.exhausted: Set[FrozenSet[NodeId]] = set()
+        self._found: List[FrozenSet[NodeId]] = []
+        self._cuts = 0
+
+    def search(self, k: Optional[int] = None) -> Optional[VertexSet]:
+        """
+        Return the first set that satisfies the solution predicate, or that
+        the state says is an alliance.
+
+        `k` can lower the size limit for this call, as vertices were only
+        filtered for the `k` the search was built with.
+        """
+        if k is None:
+            k = self.k
+        if k > self.k:
+            raise ValueError('k is larger than the search was built for')
+
+        res = None
+        for root_rank, root in enumerate(self.roots):
+            if k <= 0:
+                break
+            if root not in self._representative_set:
+                self.stats.twins += 1
+                continue
+            if self.remember and frozenset((root,)) in self.exhausted:
+                self.stats.skipped += 1
+                continue
+            ext = self._extension(root, root_rank, {root})
+            seen = {root}
+            seen.update(ext)
+
+            mark = self._push(root)
+            res = self._enter({root}, ext, seen, root_rank, k - 1)
+            self._pop(mark)
+            if res is not None:
+                break
+
+        if self.remember:
+            self.exhausted.update(self._found)
+            self._found.clear()
+
+        if res is not None:
+            return VertexSet(self.graph, res)
+        return None
+
+    def solutions(self,
+                  k: Optional[int] = None,
+                  extend: bool = True,
+                  cancelled: Optional[Callable[[], bool]] = None
+                  ) -> Iterator[FrozenSet[NodeId]]:
+        """
+        Yield every set that satisfies the solution predicate, or that the
+        state says is an alliance, each exactly once.
+
+        With `extend` off, supersets of a solution aren't searched.
+        `cancelled` is polled at each set visited, and the search stops once
+        it returns True.
+        The state is restored if the generator is closed early.
+        Twin pruning isn't applied, as every solution is wanted.
+        """
+        if k is None:
+            k = self.k
+        if k > self.k:
+            raise ValueError('k is larger than the search was built for')
+        if k <= 0:
+            return
+
+        for root_rank, root in enumerate(self.roots):
+            if cancelled is not None and cancelled():
+                return
+            ext = self._extension(root, root_rank, {root})
+            seen = {root}
+            seen.update(ext)
+
+            mark = self._push(root)
+            try:
+                yield from self._solutions(
+                    {root}, ext, seen, root_rank, k - 1, extend, cancelled
+                )
+            finally:
+                self._pop(mark)
+
+    def complete(self) -> bool:
+        """
+        Check if every root has been exhausted, so no larger limit can find
+        anything new.
+        """
+        return all(
+            frozenset((root,)) in self.exhausted
+            for root in self.representatives
+        )
+
+    def is_solution(self, current: NodeSet) -> bool:
+        """
+        Check if the current set is a solution.
+        """
+        if self.state is not None:
+            return self.state.is_alliance()
+        return self.solution_predicate(self.graph, current)
+
+    def _push(self, vertex: NodeId) -> int:
+        if self.state is None:
+            return 0
+        mark = self.state.snapshot()
+        self.state.add(vertex)
+        return mark
+
+    def _pop(self, mark: int) -> None:
+        if self.state is not None:
+            self.state.undo(mark)
+
+    def _leaves(self,
+                current: NodeSet,
+                ext: List[NodeId]) -> Optional[NodeSet]:
+        """
+        The children of a node one level above the depth limit can't be
+        extended, so just check each of them without updating the state.
+        """
+        tried: Set[int] = set()
+        for vertex in reversed(ext):
+            if self.twins is not None:
+                if self.twins[vertex] in tried:
+                    self.stats.twins += 1
+                    continue
+                tried.add(self.twins[vertex])
+            self.stats.visited += 1
+            if self.state is not None:
+                found = self.state.is_alliance_with(vertex)
+            else:
+                current.add(vertex)
+                found = self.solution_predicate(self.graph, current)
+                current.remove(vertex)
+            if found:
+                return current | {vertex}
+        return None
+
+    def _extension(self,
+                   vertex: NodeId,
+                   root_rank: int,
+                   seen: NodeSet) -> List[NodeId]:
+        """
+        Neighbours of `vertex` that can extend a set grown from the root, and
+        aren't already in or next to it.
+        """
+        rank = self.rank
+        after = self.after
+        eligible = self.eligible
+        return [
+            u for u in self.graph.neighbors(vertex)
+            if u in eligible and u not in seen
+            and rank.get(u, after) > root_rank
+        ]
+
+    def _enter(self,
+               current: NodeSet,
+               ext: List[NodeId],
+               seen: NodeSet,
+               root_rank: int,
+               depth: int) -> Optional[NodeSet]:
+        """
+        Search the subtree under `current`, recording it if it was exhausted.
+        """
+        if not self.remember:
+            return self._extend(current, ext, seen, root_rank, depth)
+
+        cuts = self._cuts
+        found = len(self._found)
+        res = self._extend(current, ext, seen, root_rank, depth)
+        if res is None and cuts == self._cuts:
+            # this covers everything recorded below it.
+            del self._found[found:]
+            self._found.append(frozenset(current))
+        return res
+
+    def _extend(self,
+                current: NodeSet,
+                ext: List[NodeId],
+                seen: NodeSet,
+                root_rank: int,
+                depth: int) -> Optional[NodeSet]:
+        self.stats.visited += 1
+        if self.is_solution(current):
+            return set(current)
+
+        if depth <= 0:
+            if ext:
+                self._cuts += 1
+            return None
+
+        if self.bound is not None and not self.bound(self.state, depth):
+            self.stats.pruned += 1
+            self._cuts += 1
+            return None
+
+        if depth == 1:
+            # the children aren't extended, so treat this as cut short
+            # unless there are none.
+            if ext:
+                self._cuts += 1
+            return self._leaves(current, ext)
+
+        ext = list(ext)
+        tried: Set[int] = set()
+        while ext:
+            vertex = ext.pop()
+            if self.twins is not None:
+                # any solution in this subtree has a twin in the subtree of
+                # the one already tried.
+                if self.twins[vertex] in tried:
+                    self.stats.twins += 1
+                    continue
+                tried.add(self.twins[vertex])
+            new = self._extension(vertex, root_rank, seen)
+            seen.update(new)
+            current.add(vertex)
+            mark = self._push(vertex)
+
+            if self.remember and frozenset(current) in self.exhausted:
+                self.stats.skipped += 1
+                res = None
+            else:
+                res = self._enter(
+                    current, ext + new, seen, root_rank, depth - 1
+                )
+
+            self._pop(mark)
+            current.remove(vertex)
+            seen.difference_update(new)
+            if res is not None:
+                return res
+
+        return None
+
+
+    def _solutions(self,
+                   current: NodeSet,
+                   ext: List[NodeId],
+                   seen: NodeSet,
+                   root_rank: int,
+                   depth: int,
+                   extend: bool,
+                   cancelled: Optional[Callable[[], bool]]
+                   ) -> Iterator[FrozenSet[NodeId]]:
+        if cancelled is not None and cancelled():
+            return
+
+        self.stats.visited += 1
+        if self.is_solution(current):
+            yield frozenset(current)
+            if not extend:
+                return
+
+        if depth <= 0:
+            return
+
+        if self.bound is not None and not self.bound(self.state, depth):
+            self.stats.pruned += 1
+            return
+
+        if depth == 1 and self.state is not None:
+            for vertex in reversed(ext):
+                self.stats.visited += 1
+                if self.state.is_alliance_with(vertex):
+                    yield frozenset(current | {vertex})
+            return
+
+        ext = list(ext)
+        while ext:
+            vertex = ext.pop()
+            new = self._extension(vertex, root_rank, seen)
+            seen.update(new)
+            current.add(vertex)
+            mark = self._push(vertex)
+            try:
+                yield from self._solutions(
+                    current, ext + new, seen, root_rank, depth - 1, extend,
+                    cancelled
+                )
+            finally:
+                self._pop(mark)
+                current.remove(vertex)
+                seen.difference_update(new)
+
+
+def canonical_traverse(graph: Graph,
+                       roots: Optional[Sequence[NodeId]],
+                       vertex_predicate: VertexPredicate,
+                       solution_predicate: SolutionPredicate,
+                       k: int,
+                       state: Optional[IncrementalAlliance] = None,
+                       bound: Optional[BoundFunction] = None,
+                       stats: Optional[SearchStatistics] = None,
+                       twins: Optional[TwinClasses] = None
+                       ) -> Optional[VertexSet]:
+    """
+    Find a connected set of up to `k` vertices, containing one of `roots`,
+    that satisfies the solution predicate (or is an alliance under `state`).
+    Each candidate set is only checked once.
+    """
+    return CanonicalSearch(
+        graph, vertex_predicate, solution_predicate, k, roots, state, bound,
+        stats, twins=twins
+    ).search()
+
+
+__all__ = [
+    'CanonicalSearch',
+    'canonical_traverse'
+]
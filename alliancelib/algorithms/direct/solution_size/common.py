@@ -7,12 +7,66 @@ from alliancelib.ds import \
     Graph, \
     NodeId, \
     NodeSet
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
 
 VertexPredicate = Callable[[Graph, NodeId, Any], bool]
 SolutionPredicate = Callable[[Graph, NodeSet], bool]
+# Given the search state and how many more vertices can be added, return False
+# if no superset can be a solution, so the branch can be pruned.
+BoundFunction = Callable[[IncrementalAlliance, int], bool]
+
+
+class SearchStatistics:
+    """
+    Counters for a solution size search.
+
+    `visited` is the number of candidate sets checked, `pruned` the number of
+    branches cut off by the bound, `skipped` the number of subtrees not
+    searched again as an earlier search had exhausted them, and `twins` the
+    number of branches not taken as a twin had already been tried.
+    """
+
+    def __init__(self):
+        self.visited = 0
+        self.pruned = 0
+        self.skipped = 0
+        self.twins = 0
+
+    def __str__(self) -> str:
+        return f'visited={self.visited} pruned={self.pruned} ' + \
+            f'skipped={self.skipped} twins={self.twins}'
+
+
+def deficit_bound(graph: Graph) -> BoundFunction:
+    """
+    Bound for threshold alliances, such as Defensive Alliances.
+
+    Each new vertex gives every member at most one more neighbour, and can
+    only help the unprotected members it is adjacent to.
+    So with `depth` vertices left, no member can be missing more than `depth`
+    neighbours, and the total deficit can't be more than `depth` times the
+    number of unprotected members one vertex can reach.
+    """
+    max_degree = max(
+        (graph.degree(vertex) for vertex in graph.nodes()), default=0
+    )
+
+    def bound(state: IncrementalAlliance, depth: int) -> bool:
+        unprotected = state.unprotected()
+        if not unprotected:
+            return True
+        reach = min(len(unprotected), max_degree)
+        if state.deficit() > depth * reach:
+            return False
+        return all(-state.slack(vertex) <= depth for vertex in unprotected)
+
+    return bound
 
 
 __all__ = [
     'VertexPredicate',
-    'SolutionPredicate'
+    'SolutionPredicate',
+    'BoundFunction',
+    'SearchStatistics',
+    'deficit_bound'
 ]
@@ -2,30 +2,54 @@
 """
 Searches for Defensive Alliances up to a certain solution size.
 """
-from typing import Optional
+from typing import Callable, Iterator, Optional
 from alliancelib.ds.types import Graph, NodeId, NodeSet
+from alliancelib.ds.vertex_set import VertexSet, Validation
+from alliancelib.ds.alliances.common import threshold_core
 from alliancelib.ds.alliances.da import \
     DefensiveAlliance, \
     is_defensive_alliance, \
-    defensive_alliance_threshold
-from alliancelib.ds.alliances.conversion import convert_to_da
+    defensive_alliance_threshold, \
+    defensive_alliance_thresholds
+from alliancelib.ds.alliances.gmda import globally_minimal_witness
+from alliancelib.ds.alliances.conversion import convert_to_da, convert_to_gmda
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+from alliancelib.algorithms.utils.twins import twin_classes
 
 
 from .base import \
         alliance_solution_size, \
-        alliance_solution_size_parallel, \
+        alliance_solution_size_parallel_bfs, \
         traverse
+from .parallel import alliance_solution_size_parallel
+from .canonical import CanonicalSearch
+from .common import BoundFunction, SearchStatistics, deficit_bound
+from .transposition import \
+    TranspositionTable, \
+    SharedTranspositionTable, \
+    scope_fingerprint
 
 
 def defensive_alliance(graph: Graph,
                        k: int,
                        r: int = -1,
-                       initial = None
+                       initial = None,
+                       canonical: bool = True,
+                       bound: Optional[BoundFunction] = None,
+                       stats: Optional[SearchStatistics] = None,
+                       table: Optional[TranspositionTable] = None,
+                       twins: bool = False
                        ) -> Optional[DefensiveAlliance]:
     """
     Find a DefensiveAlliance up to `k` vertices in size.
 
     FPT running time.
+    With `canonical`, each candidate set is only visited once, protection is
+    tracked incrementally and branches are pruned with `bound` (`deficit_bound`
+    by default), otherwise the original search is used, which can reach the
+    same set many times, but can skip repeats with a transposition `table`.
+    With `twins`, the canonical search only branches on one of each class of
+    twin vertices at each step.
     """
 
     def vertex_predicate(g: Graph, v: NodeId, d: int):
@@ -36,31 +60,168 @@ def defensive_alliance(graph: Graph,
 
     res = None
 
-    if initial:
-        res = traverse(
-            graph, set(), set(initial), vertex_predicate, solution_predicate, k
+    if canonical:
+        res = alliance_solution_size(
+            graph, vertex_predicate, solution_predicate, k,
+            roots=initial or None,
+            state=IncrementalAlliance.defensive(graph, r),
+            bound=bound if bound is not None else deficit_bound(graph),
+            stats=stats,
+            twins=twin_classes(graph) if twins else None
         )
     else:
-        res = alliance_solution_size(
-            graph, vertex_predicate, solution_predicate, k
+        possible = initial if initial else filter(
+            lambda v: vertex_predicate(graph, v, k), graph.nodes()
+        )
+        res = traverse(
+            graph, set(), set(possible), vertex_predicate, solution_predicate,
+            k, table, scope_fingerprint('defensive_alliance', r)
         )
 
     if res:
-        return convert_to_da(res, r)
+        # the solution predicate has already validated it.
+        return convert_to_da(res, r, Validation.TRUSTED)
+
+    return None
+
+
+def minimum_defensive_alliance(graph: Graph,
+                               k_max: int,
+                               r: int = -1,
+                               initial = None,
+                               bound: Optional[BoundFunction] = None,
+                               stats: Optional[SearchStatistics] = None,
+                               twins: bool = False
+                               ) -> Optional[DefensiveAlliance]:
+    """
+    Find a smallest DefensiveAlliance, if there is one with at most `k_max`
+    vertices.
+
+    Searches with k = 1, 2, ..., k_max, so the first alliance found is a
+    minimum one.
+    A single search is reused for every round, so what earlier rounds learnt
+    carries over:
+    * Vertices outside the threshold core can't be in any alliance, so are
+      dropped up front.
+    * Subtrees that were explored without hitting the size limit or the bound
+      have no solution at any size, so are skipped, including whole roots.
+    Stops early once every root is exhausted.
+    With `twins`, only one of each class of twin vertices is branched on at
+    each step.
+    """
+    thresholds = defensive_alliance_thresholds(graph, r)
+    core = threshold_core(graph, thresholds, set(graph.nodes()))
+
+    def vertex_predicate(g: Graph, v: NodeId, d: int):
+        return v in core and thresholds[v] <= d
+
+    def solution_predicate(g: Graph, v: NodeSet):
+        return is_defensive_alliance(g, v, r)
+
+    search = CanonicalSearch(
+        graph, vertex_predicate, solution_predicate, k_max,
+        roots=initial or None,
+        state=IncrementalAlliance.defensive(graph, r),
+        bound=bound if bound is not None else deficit_bound(graph),
+        stats=stats,
+        remember=True,
+        twins=twin_classes(graph) if twins else None
+    )
+
+    for k in range(1, k_max + 1):
+        res = search.search(k)
+        if res:
+            # the incremental state has already validated it.
+            return convert_to_da(res, r, Validation.TRUSTED)
+        if search.complete():
+            break
 
     return None
 
 
+def iter_defensive_alliances(graph: Graph,
+                             k: int,
+                             r: int = -1,
+                             minimal: bool = False,
+                             limit: Optional[int] = None,
+                             cancelled: Optional[Callable[[], bool]] = None,
+                             initial = None,
+                             bound: Optional[BoundFunction] = None,
+                             stats: Optional[SearchStatistics] = None
+                             ) -> Iterator[DefensiveAlliance]:
+    """
+    Yield every connected DefensiveAlliance of up to `k` vertices, each once.
+
+    With `minimal`, only the Globally Minimal ones are yielded, and supersets
+    of an alliance aren't searched.
+    Results are found lazily, so only the current search path is kept in
+    memory.
+    Stops after `limit` results, or once `cancelled` returns True, which is
+    polled as the search goes rather than just between results.
+    """
+    if limit is not None and limit <= 0:
+        return
+
+    thresholds = defensive_alliance_thresholds(graph, r)
+    core = threshold_core(graph, thresholds, set(graph.nodes()))
+
+    def vertex_predicate(g: Graph, v: NodeId, d: int):
+        return v in core and thresholds[v] <= d
+
+    def solution_predicate(g: Graph, v: NodeSet):
+        return is_defensive_alliance(g, v, r)
+
+    search = CanonicalSearch(
+        graph, vertex_predicate, solution_predicate, k,
+        roots=initial or None,
+        state=IncrementalAlliance.defensive(graph, r),
+        bound=bound if bound is not None else deficit_bound(graph),
+        stats=stats
+    )
+
+    found = 0
+    solutions = search.solutions(extend=not minimal, cancelled=cancelled)
+    try:
+        for nodes in solutions:
+            res = VertexSet(graph, nodes)
+            if minimal:
+                if globally_minimal_witness(
+                        graph, thresholds, nodes
+                ) is not None:
+                    continue
+                # checked above, and the state has validated it.
+                yield convert_to_gmda(res, r, Validation.TRUSTED)
+            else:
+                yield convert_to_da(res, r, Validation.TRUSTED)
+
+            found += 1
+            if limit is not None and found >= limit:
+                return
+    finally:
+        solutions.close()
+
+
 def defensive_alliance_parallel(graph: Graph,
                                 k: int,
                                 r: int = -1,
                                 initial = [],
-                                threads: int = 1
+                                threads: int = 1,
+                                canonical: bool = True,
+                                bound: Optional[BoundFunction] = None,
+                                table: Optional[
+                                    SharedTranspositionTable
+                                ] = None
                                 ) -> Optional[DefensiveAlliance]:
     """
     Find a DefensiveAlliance up to `k` vertices in size.
 
     FPT running time.
+    With `canonical`, workers search depth first and share work when one is
+    idle, like `defensive_alliance`.
+    Otherwise the original breadth first search is used, where workers can
+    share a `table`, so each set is only expanded once.
+    The canonical search never reaches a set twice, so `table` is only used
+    by the breadth first search.
     """
 
     def vertex_predicate(g: Graph, v: NodeId, d: int):
@@ -69,17 +230,28 @@ def defensive_alliance_parallel(graph: Graph,
     def solution_predicate(g: Graph, v: NodeSet):
         return is_defensive_alliance(g, v, r)
 
-    res = alliance_solution_size_parallel(
-        graph, initial, vertex_predicate, solution_predicate, k, threads
-    )
+    if canonical:
+        res = alliance_solution_size_parallel(
+            graph, initial, vertex_predicate, solution_predicate, k, threads,
+            state=IncrementalAlliance.defensive(graph, r),
+            bound=bound if bound is not None else deficit_bound(graph)
+        )
+    else:
+        res = alliance_solution_size_parallel_bfs(
+            graph, initial, vertex_predicate, solution_predicate, k, threads,
+            table
+        )
 
     if res:
-        return convert_to_da(res, r)
+        # the solution predicate has already validated it.
+        return convert_to_da(res, r, Validation.TRUSTED)
 
     return None
 
 
 __all__ = [
     'defensive_alliance',
+    'minimum_defensive_alliance',
+    'iter_defensive_alliances',
     'defensive_alliance_parallel'
 ]
@@ -0,0 +1,257 @@
+# pylint: disable=C0103,R0913
+"""
+Local queries for the smallest Defensive Alliance containing a vertex.
+
+A connected alliance of up to `k` vertices that contains a seed lies within
+k - 1 hops of it, and each member has at most k - 1 neighbours in it, so only
+vertices with a threshold of at most k - 1 can be used.
+So rather than searching the whole graph, the ball of those vertices around
+the seed is extracted, and the search runs inside it, costing time in the
+size of the ball rather than the graph.
+
+Protection is still measured against the thresholds from the whole graph, as
+the neighbours a vertex has outside the ball still count against it.
+
+Balls are cached on the graph, so repeated queries around the same seed
+don't extract it again.
+A batch of queries gives each seed its own ball, so each search only costs
+the size of its own ball, but works out the threshold of each vertex once for
+the whole batch.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from alliancelib.ds.types import Graph, NodeId, NodeSet
+from alliancelib.ds.csr import CSRGraph
+from alliancelib.ds.cache import graph_cache
+from alliancelib.ds.vertex_set import VertexSet, Validation
+from alliancelib.ds.alliances.common import \
+    neighbours_in_set_count, \
+    threshold_core
+from alliancelib.ds.alliances.da import \
+    DefensiveAlliance, \
+    defensive_alliance_threshold
+from alliancelib.ds.alliances.conversion import convert_to_da
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+
+from .canonical import CanonicalSearch
+from .common import SearchStatistics, deficit_bound
+
+# number of (seed, k) entries cached per graph and r.
+BALL_CACHE_SIZE = 256
+
+
+class LocalBall:
+    """
+    The vertices that a connected alliance of up to `k` vertices containing
+    one of `seeds` could use, as a CSRGraph.
+    """
+
+    def __init__(self,
+                 graph: Graph,
+                 seeds: Iterable[NodeId],
+                 k: int,
+                 r: int = -1,
+                 known: Optional[Dict[NodeId, int]] = None):
+        """
+        `known` are thresholds already worked out, which any new ones are
+        added to, so balls built for a batch can share them.
+        """
+        self.k = k
+        self.r = r
+
+        thresholds: Dict[NodeId, int] = {} if known is None else known
+
+        def eligible(vertex: NodeId) -> bool:
+            if vertex not in thresholds:
+                thresholds[vertex] = defensive_alliance_threshold(
+                    graph, vertex, r
+                )
+            return thresholds[vertex] <= k - 1
+
+        nodes: List[NodeId] = [v for v in set(seeds) if eligible(v)]
+        members = set(nodes)
+        frontier = list(nodes)
+        for _ in range(k - 1):
+            reached = []
+            for vertex in frontier:
+                for neighbour in graph.neighbors(vertex):
+                    if neighbour not in members and eligible(neighbour):
+                        members.add(neighbour)
+                        reached.append(neighbour)
+            nodes.extend(reached)
+            frontier = reached
+
+        index = {node: idx for idx, node in enumerate(nodes)}
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        targets: List[int] = []
+        for idx, node in enumerate(nodes):
+            targets.extend(sorted(
+                index[n] for n in graph.neighbors(node) if n in index
+            ))
+            offsets[idx + 1] = len(targets)
+
+        self._graph = CSRGraph(nodes, offsets, np.array(targets, np.int64))
+        self._thresholds = {node: thresholds[node] for node in nodes}
+        # alliances inside the ball are only protected by vertices in it.
+        self._core = threshold_core(
+            self._graph, self._thresholds, set(nodes)
+        )
+
+    def graph(self) -> CSRGraph:
+        """
+        Return the ball, as a graph.
+        """
+        return self._graph
+
+    def thresholds(self) -> Dict[NodeId, int]:
+        """
+        Return the thresholds of the vertices in the ball, from the whole
+        graph.
+        """
+        return self._thresholds
+
+    def core(self) -> NodeSet:
+        """
+        Return the vertices of the ball that can be in an alliance.
+        """
+        return self._core
+
+    def smallest(self,
+                 seed: NodeId,
+                 k: Optional[int] = None,
+                 stats: Optional[SearchStatistics] = None
+                 ) -> Optional[NodeSet]:
+        """
+        Find a smallest alliance containing `seed`, of up to `k` vertices.
+        """
+        if k is None:
+            k = self.k
+        if k > self.k:
+            raise ValueError('k is larger than the ball was built for')
+
+        core = self._core
+        if seed not in core:
+            return None
+
+        ball = self._graph
+        thresholds = self._thresholds
+
+        def vertex_predicate(g: Graph, v: NodeId, d: int):
+            return v in core and thresholds[v] <= d
+
+        def solution_predicate(g: Graph, v: NodeSet):
+            return all(
+                neighbours_in_set_count(g, u, v) >= thresholds[u] for u in v
+            )
+
+        search = CanonicalSearch(
+            ball, vertex_predicate, solution_predicate, k,
+            roots=[seed],
+            state=IncrementalAlliance(ball, thresholds),
+            bound=deficit_bound(ball),
+            stats=stats,
+            remember=True
+        )
+
+        for size in range(1, k + 1):
+            res = search.search(size)
+            if res:
+                return res.vertices()
+            if search.complete():
+                break
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self._graph)
+
+
+def _ball_cache(graph: Graph, r: int) -> OrderedDict:
+    return graph_cache(graph).setdefault(('local_balls', r), OrderedDict())
+
+
+def local_ball(graph: Graph,
+               seeds: Iterable[NodeId],
+               k: int,
+               r: int = -1,
+               known: Optional[Dict[NodeId, int]] = None) -> LocalBall:
+    """
+    Return a ball around `seeds`.
+
+    Balls around a single seed are cached, evicting the least recently used
+    past BALL_CACHE_SIZE entries, and reused if it is queried with the same
+    `k` again.
+    Balls around several seeds aren't, as they'd be much larger than what a
+    later query around one of them needs.
+    """
+    seeds = set(seeds)
+    if len(seeds) != 1:
+        return LocalBall(graph, seeds, k, r, known)
+
+    cache = _ball_cache(graph, r)
+    key = (next(iter(seeds)), k)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    ball = LocalBall(graph, seeds, k, r, known)
+    cache[key] = ball
+    while len(cache) > BALL_CACHE_SIZE:
+        cache.popitem(last=False)
+    return ball
+
+
+def local_defensive_alliance(graph: Graph,
+                             seed: NodeId,
+                             k: int,
+                             r: int = -1,
+                             stats: Optional[SearchStatistics] = None
+                             ) -> Optional[DefensiveAlliance]:
+    """
+    Find a smallest DefensiveAlliance containing `seed`, if there is one with
+    at most `k` vertices.
+
+    Only the ball around `seed` is searched, so this doesn't depend on the
+    size of the graph.
+    """
+    res = local_ball(graph, [seed], k, r).smallest(seed, k, stats)
+    if res is None:
+        return None
+    # the incremental state has already validated it.
+    return convert_to_da(VertexSet(graph, res), r, Validation.TRUSTED)
+
+
+def local_defensive_alliances(graph: Graph,
+                              seeds: Iterable[NodeId],
+                              k: int,
+                              r: int = -1,
+                              stats: Optional[SearchStatistics] = None
+                              ) -> Dict[NodeId, Optional[DefensiveAlliance]]:
+    """
+    Run `local_defensive_alliance` for each of `seeds`.
+
+    Each seed is searched in its own ball, but the thresholds of the vertices
+    in overlapping balls are only worked out once.
+    """
+    seeds = list(dict.fromkeys(seeds))
+    known: Dict[NodeId, int] = {}
+
+    res: Dict[NodeId, Optional[DefensiveAlliance]] = {}
+    for seed in seeds:
+        ball = local_ball(graph, [seed], k, r, known)
+        nodes = ball.smallest(seed, k, stats)
+        res[seed] = None if nodes is None else convert_to_da(
+            VertexSet(graph, nodes), r, Validation.TRUSTED
+        )
+    return res
+
+
+__all__ = [
+    'LocalBall',
+    'local_ball',
+    'local_defensive_alliance',
+    'local_defensive_alliances'
+]
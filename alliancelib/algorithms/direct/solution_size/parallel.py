@@ -0,0 +1,375 @@
+# pylint: disable=C0103,R0902,R0913
+"""
+Parallel version of the canonical extension search.
+
+Each worker claims roots one at a time and searches under them depth first,
+with an explicit stack, so it only holds O(k) frames.
+When another worker is idle, a busy worker gives away half the untried
+siblings from the shallowest frame of its stack, which is the largest piece of
+work it has.
+Work is only split off on demand, so the queue never holds more than a
+task per idle worker, and memory stays O(workers * k) (ignoring the O(deg)
+extension lists each frame carries).
+
+A task is a prefix of the current set, the vertices still to try extending it
+with, and the vertices that were given to another worker to try but that
+still belong in the extension sets passed down (ESU tries the vertices in
+order, and each child can be extended by the siblings that come after it).
+The rest of the search state (the neighbourhood of the prefix, the
+incremental protection state) is rebuilt from the prefix by whichever worker
+takes it.
+
+The first solution found stops every worker, and they are all joined before
+returning.
+Idle workers wait on the task queue with a timeout, checking if the search
+has stopped in between, so no sentinels need to be sent to them, and a donor
+never exits part way through writing a task.
+If a worker raises, the search stops and the exception is raised in the
+parent.
+Workers are forked, so the predicates and state do not need to be picklable.
+The graph is published to shared memory for the duration of the search, and
+each worker attaches to it rather than working on its own copy-on-write copy
+of the parent's graph.
+"""
+import multiprocessing as mp
+import pickle
+import queue
+import traceback
+from typing import List, Optional, Sequence
+from alliancelib.ds import \
+    Graph, \
+    NodeId, \
+    VertexSet, \
+    publish_graph, \
+    attach_graph
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+from .common import \
+    VertexPredicate, \
+    SolutionPredicate, \
+    BoundFunction
+from .canonical import CanonicalSearch
+
+# seconds between checks of whether the search has stopped, while waiting.
+POLL_INTERVAL = 0.05
+
+
+class ParallelCanonicalSearch(CanonicalSearch):
+    """
+    Canonical extension search, split between `threads` worker processes.
+    """
+
+    def __init__(self,
+                 graph: Graph,
+                 vertex_predicate: VertexPredicate,
+                 solution_predicate: SolutionPredicate,
+                 k: int,
+                 roots: Optional[Sequence[NodeId]] = None,
+                 state: Optional[IncrementalAlliance] = None,
+                 bound: Optional[BoundFunction] = None,
+                 threads: int = 1):
+        super().__init__(
+            graph, vertex_predicate, solution_predicate, k, roots, state,
+            bound
+        )
+        self.threads = max(1, threads)
+
+    def search(self, k: Optional[int] = None) -> Optional[VertexSet]:
+        """
+        Return the first set found by any worker that satisfies the solution
+        predicate, or that the state says is an alliance.
+        """
+        if k is not None and k != self.k:
+            raise ValueError('the parallel search only supports its own k')
+        if self.k <= 0 or not self.roots:
+            return None
+
+        ctx = mp.get_context('fork')
+        shared = publish_graph(self.graph)
+        self._handle = shared.handle()
+        self._lock = ctx.Lock()
+        self._next_root = ctx.RawValue('q', 0)
+        self._active = ctx.RawValue('q', 0)
+        self._idle = ctx.RawValue('q', 0)
+        self._queued = ctx.RawValue('q', 0)
+        self._stop = ctx.RawValue('b', 0)
+        self._done = ctx.Event()
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+
+        workers = [
+            ctx.Process(target=self._worker, daemon=True)
+            for _ in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+
+        res = None
+        try:
+            while not self._done.wait(POLL_INTERVAL):
+                if any(worker.exitcode for worker in workers):
+                    raise RuntimeError('a search worker died')
+            if self._stop.value:
+                res = self._results.get()
+        finally:
+            with self._lock:
+                self._stop.value = 1
+            for worker in workers:
+                worker.join(POLL_INTERVAL)
+                while worker.is_alive():
+                    # a donor can't exit until its task is in the pipe,
+                    # which may need reading to make room.
+                    self._drain()
+                    worker.join(POLL_INTERVAL)
+            self._tasks.close()
+            self._results.close()
+            shared.close()
+
+        if isinstance(res, BaseException):
+            raise res
+        if res is not None:
+            return VertexSet(self.graph, set(res))
+        return None
+
+    def _worker(self) -> None:
+        # pylint: disable=W0703
+        try:
+            self.graph = attach_graph(self._handle)
+            if self.state is not None:
+                self.state = IncrementalAlliance(
+                    self.graph, self.state.thresholds()
+                )
+        except BaseException as exc:
+            self._fail(exc)
+            return
+
+        while not self._stop.value:
+            task = self._take()
+            if task is None:
+                break
+            # the failure has to be reported before the task is finished,
+            # or the parent could see every task done and return None.
+            try:
+                self._run(*task)
+            except BaseException as exc:
+                self._fail(exc)
+                return
+            finally:
+                self._finish()
+
+    def _take(self):
+        """
+        Claim the next root, or wait for another worker to donate a task.
+        Returns None once the search has stopped.
+        """
+        with self._lock:
+            rank = self._next_root.value
+            if rank < len(self.roots):
+                self._next_root.value += 1
+                self._active.value += 1
+                return (rank, [self.roots[rank]], None, [])
+            self._idle.value += 1
+
+        task = None
+        try:
+            while not self._stop.value:
+                try:
+                    task = self._tasks.get(timeout=POLL_INTERVAL)
+                    break
+                except queue.Empty:
+                    continue
+        finally:
+            with self._lock:
+                self._idle.value -= 1
+                if task is not None:
+                    self._queued.value -= 1
+        return task
+
+    def _drain(self) -> None:
+        """
+        Throw away any tasks left in the queue.
+        """
+        try:
+            while True:
+                self._tasks.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._active.value -= 1
+            if self._active.value == 0 and \
+                    self._next_root.value >= len(self.roots):
+                self._done.set()
+
+    def _donate(self, task) -> bool:
+        with self._lock:
+            if self._stop.value:
+                return False
+            self._active.value += 1
+            self._queued.value += 1
+        self._tasks.put(task)
+        return True
+
+    def _report(self, solution) -> None:
+        """
+        Pass a solution, or an exception, back to the parent, unless another
+        worker already has.
+        """
+        with self._lock:
+            if self._stop.value:
+                return
+            self._results.put(solution)
+            self._stop.value = 1
+        self._done.set()
+
+    def _fail(self, exc: BaseException) -> None:
+        try:
+            pickle.dumps(exc)
+        except Exception:  # pylint: disable=W0703
+            exc = RuntimeError(
+                'search worker failed:\n' +
+                ''.join(traceback.format_exception(exc))
+            )
+        self._report(exc)
+
+    def _run(self,
+             root_rank: int,
+             prefix: List[NodeId],
+             ext: Optional[List[NodeId]],
+             carry: List[NodeId]) -> None:
+        """
+        Search under `prefix`, trying the vertices in `ext`, and passing
+        `carry` down as well.
+        If `ext` is None, this is a new root, so its extension set is
+        computed and the root itself checked.
+        """
+        graph = self.graph
+        state = self.state
+        bound = self.bound
+
+        current = list(prefix)
+        members = set(current)
+        seen = set(current)
+        for vertex in current:
+            seen.update(graph.neighbors(vertex))
+
+        start = state.snapshot() if state is not None else 0
+        if state is not None:
+            for vertex in current:
+                state.add(vertex)
+
+        if ext is None:
+            ext = self._extension(current[0], root_rank, {current[0]})
+            self.stats.visited += 1
+            if self.is_solution(members):
+                self._report(current)
+                self._pop(start)
+                return
+            if bound is not None and not bound(state, self.k - 1):
+                self.stats.pruned += 1
+                self._pop(start)
+                return
+
+        # each frame is [untried vertices, depth left, its new ext vertices,
+        # state mark, carried vertices], and the frame at index i extends
+        # current[:len(prefix) + i].
+        stack = [[list(ext), self.k - len(current), [], start, carry]]
+        while stack:
+            if self._stop.value:
+                break
+
+            if self._idle.value > self._queued.value:
+                self._split(root_rank, current, len(prefix), stack)
+
+            frame = stack[-1]
+            untried, depth = frame[0], frame[1]
+
+            if depth <= 0 or not untried:
+                stack.pop()
+                if stack:
+                    vertex = current.pop()
+                    members.discard(vertex)
+                    seen.difference_update(frame[2])
+                    self._pop(frame[3])
+                continue
+
+            if depth == 1:
+                res = self._leaves(members, untried)
+                untried.clear()
+                if res is not None:
+                    self._report(list(res))
+                continue
+
+            vertex = untried.pop()
+            new = self._extension(vertex, root_rank, seen)
+            seen.update(new)
+            current.append(vertex)
+            members.add(vertex)
+            mark = self._push(vertex)
+            stack.append([frame[4] + untried + new, depth - 1, new, mark, []])
+
+            self.stats.visited += 1
+            if self.is_solution(members):
+                self._report(list(current))
+                break
+            if bound is not None and not bound(state, depth - 1):
+                self.stats.pruned += 1
+                stack[-1][0] = []
+
+        self._pop(start)
+
+    def _split(self,
+               root_rank: int,
+               current: List[NodeId],
+               base: int,
+               stack: List) -> None:
+        """
+        Give away half the untried vertices of the shallowest frame that has
+        more than one.
+        Keeping half means a task can't just be passed around between idle
+        workers without any of them making progress.
+
+        The donated half is the one this worker would have tried next, so the
+        half it keeps is carried along with it.
+        """
+        for idx, frame in enumerate(stack):
+            untried = frame[0]
+            if len(untried) > 1 and frame[1] > 0:
+                half = len(untried) // 2
+                if self._donate((
+                    root_rank,
+                    current[:base + idx],
+                    untried[half:],
+                    frame[4] + untried[:half]
+                )):
+                    del untried[half:]
+                return
+
+
+def alliance_solution_size_parallel(graph: Graph,
+                                    initial: Optional[List],
+                                    vertex_predicate: VertexPredicate,
+                                    solution_predicate: SolutionPredicate,
+                                    k: int,
+                                    threads: int = 1,
+                                    state: Optional[
+                                        IncrementalAlliance
+                                    ] = None,
+                                    bound: Optional[BoundFunction] = None
+                                    ) -> Optional[VertexSet]:
+    """
+    Finds a connected alliance, up to a certain size, using `threads`
+    processes that search depth first and share work when one runs out.
+
+    `initial` are the roots to search from, or all of them if empty.
+    """
+    return ParallelCanonicalSearch(
+        graph, vertex_predicate, solution_predicate, k, initial or None,
+        state, bound, threads
+    ).search()
+
+
+__all__ = [
+    'ParallelCanonicalSearch',
+    'alliance_solution_size_parallel'
+]
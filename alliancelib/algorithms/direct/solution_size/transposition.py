@@ -0,0 +1,275 @@
+# pylint: disable=C0103
+"""
+Transposition tables for the solution size search.
+
+`traverse` can reach the same partial set along many different paths, and
+the workers of `alliance_solution_size_parallel_bfs` can be handed the same
+set by different parents.
+These tables remember sets that have already been handled, so their subtree is
+not explored again.
+The canonical searches (including the default work-sharing parallel one)
+visit each set once, so they don't use a table.
+
+Whether a subtree holds a solution depends on the predicates it was searched
+with, so each search mixes a `scope_fingerprint` of what it is searching for
+into its fingerprints, and entries from other searches sharing a table are
+never matched.
+Fingerprints don't identify the graph, so a table shouldn't be shared between
+graphs.
+
+A set is stored as a 64-bit fingerprint, the XOR of a hash of each member, so
+it is the same however the set was built and in whichever process, along with
+the remaining depth it was explored to.
+Exploring a set to some depth covers any smaller depth, so a lookup only hits
+if the stored depth is at least as large.
+
+Fingerprints can collide, which would wrongly skip a set, but with 56+ bits
+that is vanishingly unlikely for the sizes of search this is used for.
+
+`TranspositionTable` is a local LRU table.
+`SharedTranspositionTable` lives in shared memory so forked workers can all
+use it, and evicts with the CLOCK algorithm.
+"""
+import ctypes
+import multiprocessing as mp
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Iterable
+
+from alliancelib.ds.types import NodeId
+
+FINGERPRINT_MASK = (1 << 64) - 1
+
+# Shared entries pack a 56 bit fingerprint above an 8 bit depth.
+DEPTH_BITS = 8
+MAX_DEPTH = (1 << DEPTH_BITS) - 1
+
+# node hashes kept, so the cache doesn't grow with every graph searched.
+FINGERPRINT_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=FINGERPRINT_CACHE_SIZE)
+def node_fingerprint(node: NodeId) -> int:
+    """
+    64-bit hash of a node, stable across processes.
+    """
+    digest = blake2b(repr(node).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def set_fingerprint(nodes: Iterable[NodeId], scope: int = 0) -> int:
+    """
+    64-bit fingerprint of a set of nodes, independent of the order, within
+    `scope`.
+    """
+    res = scope
+    for node in nodes:
+        res ^= node_fingerprint(node)
+    return res
+
+
+def scope_fingerprint(*key) -> int:
+    """
+    64-bit fingerprint of what a search is looking for, such as its kind of
+    alliance and r, to pass to `set_fingerprint`.
+    """
+    return node_fingerprint(('scope',) + key)
+
+
+class TranspositionTable:
+    """
+    Bounded table of explored sets, evicting the least recently used.
+
+    `capacity` is the maximum number of entries kept, which caps the memory
+    used.
+    """
+
+    def __init__(self, capacity: int = 1 << 20):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def explored(self, fingerprint: int, depth: int) -> bool:
+        """
+        Check if the set was already explored to at least `depth`.
+        """
+        stored = self._entries.get(fingerprint)
+        if stored is not None and stored >= depth:
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def store(self, fingerprint: int, depth: int) -> None:
+        """
+        Record that the set has been explored to `depth`.
+        """
+        entries = self._entries
+        stored = entries.get(fingerprint)
+        if stored is not None:
+            entries[fingerprint] = max(stored, depth)
+            entries.move_to_end(fingerprint)
+            return
+
+        entries[fingerprint] = depth
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Forget every entry, keeping the statistics.
+        """
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the hit, miss and eviction counts, and the current size.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries)
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in shared memory, for workers forked after it is
+    created.
+
+    Entries are single 64-bit words, so they are written atomically without
+    needing a lock.
+    The table is split into buckets of `ways` slots, and a full bucket evicts
+    with CLOCK, using a reference bit per slot.
+    It takes 9 bytes per slot, plus 24 bytes per worker for the statistics,
+    which each worker keeps in its own slot after calling `bind()`.
+    """
+
+    def __init__(self, capacity: int = 1 << 20, ways: int = 4,
+                 workers: int = 1):
+        if capacity <= 0 or ways <= 0:
+            raise ValueError('capacity and ways must be positive')
+        self.ways = ways
+        self.buckets = max(1, capacity // ways)
+        self.capacity = self.buckets * ways
+
+        self._entries = mp.RawArray(ctypes.c_uint64, self.capacity)
+        self._referenced = mp.RawArray(ctypes.c_uint8, self.capacity)
+        self._hands = mp.RawArray(ctypes.c_uint8, self.buckets)
+        # hits, misses, evictions for each worker.
+        self.workers = workers
+        self._counters = mp.RawArray(ctypes.c_int64, 3 * (workers + 1))
+        self._slot = 0
+
+    def bind(self, worker: int) -> None:
+        """
+        Set which worker's statistics this process updates, from 0 up to
+        `workers - 1`.
+        """
+        if not 0 <= worker < self.workers:
+            raise ValueError(
+                f'worker {worker} out of range for {self.workers} workers'
+            )
+        self._slot = 3 * (worker + 1)
+
+    def _key(self, fingerprint: int) -> int:
+        key = (fingerprint & FINGERPRINT_MASK) >> DEPTH_BITS
+        # 0 marks an empty slot.
+        return key if key else 1
+
+    def explored(self, fingerprint: int, depth: int) -> bool:
+        """
+        Check if the set was already explored to at least `depth`.
+        """
+        key = self._key(fingerprint)
+        start = (key % self.buckets) * self.ways
+        entries = self._entries
+        for slot in range(start, start + self.ways):
+            entry = entries[slot]
+            if entry >> DEPTH_BITS == key and entry & MAX_DEPTH >= depth:
+                self._referenced[slot] = 1
+                self._counters[self._slot] += 1
+                return True
+        self._counters[self._slot + 1] += 1
+        return False
+
+    def store(self, fingerprint: int, depth: int) -> None:
+        """
+        Record that the set has been explored to `depth`.
+        """
+        key = self._key(fingerprint)
+        bucket = key % self.buckets
+        start = bucket * self.ways
+        entries = self._entries
+        referenced = self._referenced
+
+        victim = None
+        used = 0
+        for slot in range(start, start + self.ways):
+            entry = entries[slot]
+            if entry >> DEPTH_BITS == key:
+                depth = max(depth, entry & MAX_DEPTH)
+                victim = slot
+                used = 1
+                break
+            if entry == 0 and victim is None:
+                victim = slot
+
+        if victim is None:
+            # CLOCK: skip over (and clear) recently used slots.
+            hand = self._hands[bucket]
+            while referenced[start + hand]:
+                referenced[start + hand] = 0
+                hand = (hand + 1) % self.ways
+            victim = start + hand
+            self._hands[bucket] = (hand + 1) % self.ways
+            self._counters[self._slot + 2] += 1
+
+        entries[victim] = (key << DEPTH_BITS) | min(depth, MAX_DEPTH)
+        # new entries only get a second chance once they are hit.
+        referenced[victim] = used
+
+    def clear(self) -> None:
+        """
+        Forget every entry, keeping the statistics.
+        Only call this while no workers are using the table.
+        """
+        for array in (self._entries, self._referenced, self._hands):
+            ctypes.memset(array, 0, ctypes.sizeof(array))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the hit, miss and eviction counts summed over every worker, and
+        the current size.
+        """
+        counters = self._counters
+        return {
+            'hits': sum(counters[0::3]),
+            'misses': sum(counters[1::3]),
+            'evictions': sum(counters[2::3]),
+            'size': sum(1 for entry in self._entries if entry)
+        }
+
+    def __len__(self) -> int:
+        return self.stats()['size']
+
+
+__all__ = [
+    'node_fingerprint',
+    'set_fingerprint',
+    'scope_fingerprint',
+    'TranspositionTable',
+    'SharedTranspositionTable'
+]
@@ -3,9 +3,13 @@
 Collection of cost functions to use for evaluating an Alliance
 """
 from collections.abc import Callable
+
+import numpy as np
+
 from alliancelib.ds.types import Graph, NodeSet
 from alliancelib.ds.alliances.common import neighbours_in_set_count
-from alliancelib.ds.alliances.da import defensive_alliance_threshold
+from alliancelib.ds.alliances.da import defensive_alliance_thresholds
+from alliancelib.ds.alliances.batch import verify_defensive_alliances
 
 
 # Type definitions for functions that guide towards an acceptable solution
@@ -19,17 +23,30 @@ def da_score(graph: Graph, ns: NodeSet, r: int = -1) -> float:
 
     Currently just the number of vertices away from being fully protected.
     """
+    thresholds = defensive_alliance_thresholds(graph, r)
     score = 0.0
     for vertex in ns:
-        threshold = defensive_alliance_threshold(graph, vertex, r)
+        threshold = thresholds[vertex]
         count = neighbours_in_set_count(graph, vertex, ns)
         score += (threshold - count) if (count < threshold) else 0
 
     return score
 
 
+def da_scores(graph: Graph, membership: np.ndarray, r: int = -1) -> np.ndarray:
+    """
+    `da_score` for a whole population at once.
+
+    `membership` has one 0/1 row per candidate, with columns in the order of
+    `graph.nodes()`.
+    """
+    _, deficits = verify_defensive_alliances(graph, membership, r)
+    return deficits.astype(float)
+
+
 __all__ = [
     'da_score',
+    'da_scores',
     'AcceptFunction',
     'ScoreFunction'
 ]
@@ -2,27 +2,66 @@
 """
 Heuristic Algorithm based around reducing the number of external vertices
 needed.
+
+When the score is the deficit against some thresholds (as `da_score` is),
+moves are scored from a MoveQueue in O(deg) rather than by scoring a new set
+for every vertex.
 """
 import random
-from typing import Optional
+from collections.abc import Mapping
+from typing import Optional, Tuple
 from alliancelib.ds.types import Graph, NodeSet
-from alliancelib.ds.vertex_set import VertexSet
+from alliancelib.ds.vertex_set import VertexSet, Validation
 from alliancelib.ds.alliances.da import \
     DefensiveAlliance, \
+    defensive_alliance_thresholds, \
     is_defensive_alliance
 from alliancelib.ds.alliances.conversion import convert_to_da
 
 from .cost_functions import da_score, AcceptFunction, ScoreFunction
+from .moves import Move, MoveQueue
+
+
+def _choose_move(moves: MoveQueue,
+                 p_add: float,
+                 p_best: float = 1.0,
+                 rng=random,
+                 max_size: Optional[int] = None
+                 ) -> Tuple[Optional[Move], Optional[Move]]:
+    """
+    Decide whether to add or remove a vertex, and return the best such move
+    along with the one to take.
+
+    Sets are never emptied, as the empty set scores 0, and don't grow past
+    `max_size`.
+    """
+    if max_size is not None and len(moves) >= max_size:
+        adding = False
+    else:
+        adding = rng.random() <= p_add or len(moves) <= 1
+    best = moves.best(adding)
+    if best is None and len(moves) > 1:
+        adding = False
+        best = moves.best(adding)
+    if best is None or rng.random() < p_best:
+        return best, best
+    return best, moves.sample(adding, rng)
 
 
 class CostReductionAlgo:
     def __init__(self, graph, score_function, accept_function, p_add=0.6,
-            p_best=0.9):
+            p_best=0.9, thresholds=None, rng=None, max_size=None):
         self.graph = graph
         self.p_add = p_add
         self.p_best = p_best
         self.score_function = score_function
         self.accept_function = accept_function
+        # score_function is the deficit against these, if given.
+        self.thresholds = thresholds
+        # the global generator is used if no rng is given.
+        self.rng = random if rng is None else rng
+        # sets are kept to at most this many vertices, if given.
+        self.max_size = max_size
         self.return_value = None
         self.setup()
 
@@ -30,19 +69,54 @@ class CostReductionAlgo:
         return self.return_value
 
     def setup(self):
-        first_vertex = random.choice(list(self.graph.nodes()))
+        first_vertex = self.rng.choice(list(self.graph.nodes()))
+        if self.thresholds is not None:
+            self.moves = MoveQueue(self.graph, self.thresholds)
+            self.moves.add(first_vertex)
         self.current = [
             self.score_function(self.graph, set([first_vertex])),
             set([first_vertex])
         ]
         self.best_res = [float('inf'), set()]
 
+    def run_moves(self, generations: int = 25):
+        """
+        `run`, scoring moves with the MoveQueue.
+        """
+        moves = self.moves
+        for _ in range(generations):
+            best, move = _choose_move(
+                moves, self.p_add, self.p_best, self.rng, self.max_size
+            )
+            if best is None:
+                return
+
+            score = moves.score() + best[0]
+            size = len(moves) + (-1 if best[1] in moves else 1)
+            if score < self.best_res[0]:
+                self.best_res = [score, moves.vertices() ^ {best[1]}]
+
+            # only a set with no deficit can be accepted, and only a smaller
+            # one is kept, so a plateau of alliances isn't copied each step.
+            if score == 0 and (self.return_value is None or
+                               size < len(self.return_value)):
+                res = moves.vertices() ^ {best[1]}
+                if self.accept_function(self.graph, res):
+                    self.return_value = res
+
+            moves.move(move[1])
+
     def run(self, generations: int = 25):
+        if self.thresholds is not None:
+            self.run_moves(generations)
+            return
+
         for _ in range(generations):
             candidates = []
             # decide to either add or remove a vertex
             while not candidates:
-                if random.random() > self.p_add and len(self.current) > 0:
+                if self.rng.random() > self.p_add and \
+                        len(self.current) > 0:
                     candidates = [
                         self.current[1] - set([i]) for i in self.current[1]
                     ]
@@ -76,26 +150,75 @@ class CostReductionAlgo:
                     self.return_value = self.best_res[1]
 
             # decide which one we set as the next one based on their score.
-            if random.random() < self.p_best:
+            if self.rng.random() < self.p_best:
                 self.current = round_best
             else:
-                choice = random.choice(candidates)
+                choice = self.rng.choice(candidates)
                 score = self.score_function(self.graph, choice)
                 self.current = [score, choice]
 
 
+def reduce_cost_moves(
+                      graph: Graph,
+                      thresholds: Mapping,
+                      accept_function: AcceptFunction,
+                      steps: int = 1024,
+                      p_add: float = 0.60,
+                      rng: Optional[random.Random] = None
+                      ) -> Optional[VertexSet]:
+    """
+    `reduce_cost_core` with the deficit against `thresholds` as the score,
+    taking each step from a MoveQueue.
+    """
+    if rng is None:
+        rng = random
+    moves = MoveQueue(graph, thresholds)
+    moves.add(rng.choice(list(graph.nodes())))
+    best: tuple[float, NodeSet] = (float('inf'), set())
+
+    for _ in range(steps):
+        move, _ = _choose_move(moves, p_add, rng=rng)
+        if move is None:
+            break
+        moves.move(move[1])
+
+        if moves.score() < best[0]:
+            best = (moves.score(), moves.vertices())
+            # nothing can score lower.
+            if best[0] == 0:
+                break
+
+    if best[0] == 0 and accept_function(graph, best[1]):
+        return VertexSet(graph, best[1])
+
+    return None
+
+
 def reduce_cost_core(
                      graph: Graph,
                      score_function: ScoreFunction,
                      accept_function: AcceptFunction,
                      steps: int = 1024,
-                     p_add: float = 0.60
+                     p_add: float = 0.60,
+                     thresholds: Optional[Mapping] = None,
+                     rng: Optional[random.Random] = None
                      ) -> Optional[VertexSet]:
     """
     Base of the algorithm.
+
+    If `score_function` is the deficit against `thresholds`, passing them
+    uses `reduce_cost_moves` instead.
+    Random choices are drawn from `rng`, or the global generator.
     """
+    if thresholds is not None:
+        return reduce_cost_moves(
+            graph, thresholds, accept_function, steps, p_add, rng
+        )
+    if rng is None:
+        rng = random
+
     # Setup
-    first_vertex = random.choice(list(graph.nodes()))
+    first_vertex = rng.choice(list(graph.nodes()))
     current: tuple[float, NodeSet] = (
         score_function(graph, set([first_vertex])), set([first_vertex])
     )
@@ -105,7 +228,7 @@ def reduce_cost_core(
     for _ in range(steps):
         candidates = []
         # decide to either add or remove a vertex
-        if random.random() > p_add and len(current) > 0:
+        if rng.random() > p_add and len(current) > 0:
             candidates = [current[1] - set([i]) for i in current[1]]
         else:
             candidates = list(filter(
@@ -137,7 +260,8 @@ def defensive_alliance_reduce_cost(
                                    graph: Graph,
                                    r: int = -1,
                                    steps: int = 1024,
-                                   p_add: float = 0.9
+                                   p_add: float = 0.9,
+                                   rng: Optional[random.Random] = None
                                    ) -> Optional[DefensiveAlliance]:
     """
     Heuristic to find Defensive Alliances
@@ -151,16 +275,18 @@ def defensive_alliance_reduce_cost(
         return da_score(graph, ns, r)
 
     res = reduce_cost_core(
-        graph, score_function, accept_function, steps, p_add
+        graph, score_function, accept_function, steps, p_add,
+        defensive_alliance_thresholds(graph, r), rng
     )
 
     if res:
-        return convert_to_da(res, r)
+        # accept_function has already validated it.
+        return convert_to_da(res, r, Validation.TRUSTED)
 
     return None
 
 
-def DACostReduction(graph, p_add, p_best, r=-1):
+def DACostReduction(graph, p_add, p_best, r=-1, rng=None, max_size=None):
     def accept_function(graph: Graph, ns: NodeSet) -> bool:
         return is_defensive_alliance(graph, ns, r)
 
@@ -169,11 +295,12 @@ def DACostReduction(graph, p_add, p_best, r=-1):
         return da_score(graph, ns, r)
 
     return CostReductionAlgo(graph, score_function, accept_function, p_add,
-            p_best)
+            p_best, defensive_alliance_thresholds(graph, r), rng, max_size)
 
 
 __all__ = [
     'reduce_cost_core',
+    'reduce_cost_moves',
     'defensive_alliance_reduce_cost',
     'DACostReduction'
 ]
@@ -10,6 +10,7 @@ import random
 import multiprocessing
 from typing import Any, List, Dict, Optional
 
+import numpy as np
 from deap import base
 from deap import creator
 from deap import tools
@@ -17,7 +18,7 @@ from deap import tools
 from alliancelib.ds.types import Graph, NodeSet
 from alliancelib.ds.alliances.da import DefensiveAlliance
 
-from .cost_functions import da_score
+from .cost_functions import da_score, da_scores
 
 
 def bits_to_nodeset(mapping: Dict, alliance: List[bool]) -> NodeSet:
@@ -117,16 +118,29 @@ class DAGenetic:
             return DefensiveAlliance(
                 self.graph,
                 bits_to_nodeset(self.nodeset_map, best_ind),
+                self.r
             )
 
         return None
 
+    def evaluate_population(self, individuals: List) -> List:
+        """
+        Evaluate a list of individuals in one batch, giving the same fitness
+        values as the `evaluate` function in the toolbox.
+        """
+        if not individuals:
+            return []
+        membership = np.array(individuals, dtype=np.uint8)
+        scores = da_scores(self.graph, membership, self.r)
+        sizes = membership.sum(axis=1)
+        return list(zip(scores.tolist(), sizes.tolist()))
+
     def initial_population(self) -> None:
         """
         Setup the initial population
         """
         self.pop = self.toolbox.population(n=self.population)
-        self.fitnesses = map(self.toolbox.evaluate, self.pop)
+        self.fitnesses = self.evaluate_population(self.pop)
         for ind, fit in zip(self.pop, self.fitnesses):
             ind.fitness.values = fit
 
@@ -168,7 +182,7 @@ class DAGenetic:
                 del mutant.fitness.values
 
         invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-        fitnesses = map(self.toolbox.evaluate, invalid_ind)
+        fitnesses = self.evaluate_population(invalid_ind)
         for ind, fit in zip(invalid_ind, fitnesses):
             ind.fitness.values = fit
 
@@ -0,0 +1,196 @@
+# pylint: disable=C0103
+"""
+Scoring single vertex moves for local search, without rescoring every
+candidate set.
+
+The score of a set is its deficit, as `da_score` computes, which an
+IncrementalAlliance keeps track of.
+The change in deficit from adding or removing each vertex is cached, and the
+vertices are bucketed by it, so the best move is found by looking at the
+lowest bucket instead of scoring a candidate for every vertex.
+
+A move only changes the counts of the moved vertex's neighbours, so only their
+changes, and those of the neighbours of any member that became protected or
+unprotected, need to be worked out again.
+
+Buckets and members are kept in insertion order rather than in sets, so ties
+are broken the same way on every run, whatever the hash seed.
+"""
+import random
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+
+from alliancelib.ds.types import Graph, NodeId, NodeSet
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+
+# change in deficit, and the vertex to move.
+Move = Tuple[int, NodeId]
+
+
+class MoveQueue:
+    """
+    A set of vertices, along with the change in its deficit from adding or
+    removing each vertex of the graph.
+    """
+
+    def __init__(self, graph: Graph, thresholds: Mapping):
+        self._state = IncrementalAlliance(graph, thresholds)
+        self._graph = graph
+        self._nodes: List[NodeId] = list(graph.nodes())
+
+        # the side of the set each vertex is on, and its change in deficit.
+        self._delta: Dict[NodeId, Tuple[bool, int]] = {}
+        # buckets of vertices outside the set, and of members, by change,
+        # each an insertion ordered dict of vertices.
+        self._buckets: Tuple[Dict[int, Dict[NodeId, None]], ...] = ({}, {})
+        # the members, in the order they were added.
+        self._members: Dict[NodeId, None] = {}
+
+        for vertex in self._nodes:
+            self._place(vertex)
+
+    def state(self) -> IncrementalAlliance:
+        """
+        Return the underlying state.
+        """
+        return self._state
+
+    def vertices(self) -> NodeSet:
+        """
+        Return a copy of the current members.
+        """
+        return self._state.vertices()
+
+    def score(self) -> int:
+        """
+        Return the deficit of the set.
+        """
+        return self._state.deficit()
+
+    def delta(self, vertex: NodeId) -> int:
+        """
+        Change in deficit from adding `vertex`, or removing it if it is a
+        member.
+        """
+        return self._delta[vertex][1]
+
+    def best(self, adding: bool) -> Optional[Move]:
+        """
+        Return the move adding (or removing) a vertex that lowers the deficit
+        the most, or None if there are no vertices to move.
+        Ties go to the vertex that has been in its bucket longest.
+        """
+        buckets = self._buckets[not adding]
+        if not buckets:
+            return None
+        delta = min(buckets)
+        return (delta, next(iter(buckets[delta])))
+
+    def sample(self,
+               adding: bool,
+               rng: Optional[random.Random] = None
+               ) -> Optional[Move]:
+        """
+        Return a random move adding (or removing) a vertex, or None if there
+        are no vertices to move.
+        Draws from `rng`, or the global generator if it isn't given.
+        """
+        choice = random.choice if rng is None else rng.choice
+        state = self._state
+        if adding:
+            # the set is usually far smaller than the graph, so this rarely
+            # has to fall back to listing the candidates.
+            for _ in range(8):
+                vertex = choice(self._nodes)
+                if vertex not in state:
+                    return (self.delta(vertex), vertex)
+            candidates = [v for v in self._nodes if v not in state]
+        else:
+            candidates = list(self._members)
+
+        if not candidates:
+            return None
+        vertex = choice(candidates)
+        return (self.delta(vertex), vertex)
+
+    def add(self, vertex: NodeId) -> None:
+        """
+        Add `vertex` to the set.
+        """
+        if vertex in self._state:
+            return
+        self._state.add(vertex)
+        self._members[vertex] = None
+        self._update(vertex, (0, 1))
+
+    def remove(self, vertex: NodeId) -> None:
+        """
+        Remove `vertex` from the set.
+        """
+        if vertex not in self._state:
+            return
+        self._state.remove(vertex)
+        del self._members[vertex]
+        self._update(vertex, (-1, 0))
+
+    def move(self, vertex: NodeId) -> None:
+        """
+        Add `vertex` if it is outside the set, otherwise remove it.
+        """
+        if vertex in self._state:
+            self.remove(vertex)
+        else:
+            self.add(vertex)
+
+    def _update(self, vertex: NodeId, flipped: Tuple[int, int]) -> None:
+        """
+        Work out the changes again after `vertex` was moved.
+
+        A member's neighbours only see it change if its slack crossed between
+        -1, 0 and 1, which after the move leaves it at one of `flipped`.
+        """
+        state = self._state
+        # the trail is only for backtracking, which isn't done here.
+        state.commit()
+
+        # ordered, so buckets are refilled in the same order every run.
+        stale = {vertex: None}
+        for neighbour in self._graph.neighbors(vertex):
+            stale[neighbour] = None
+            if neighbour in state and state.slack(neighbour) in flipped:
+                stale.update(dict.fromkeys(self._graph.neighbors(neighbour)))
+
+        for node in stale:
+            self._place(node)
+
+    def _place(self, vertex: NodeId) -> None:
+        state = self._state
+        member = vertex in state
+        if member:
+            delta = state.remove_delta(vertex)
+        else:
+            delta = state.add_delta(vertex)
+
+        old = self._delta.get(vertex)
+        if old == (member, delta):
+            return
+        if old is not None:
+            buckets = self._buckets[old[0]]
+            bucket = buckets[old[1]]
+            del bucket[vertex]
+            if not bucket:
+                del buckets[old[1]]
+
+        self._delta[vertex] = (member, delta)
+        self._buckets[member].setdefault(delta, {})[vertex] = None
+
+    def __contains__(self, vertex: NodeId) -> bool:
+        return vertex in self._state
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+
+__all__ = [
+    'MoveQueue'
+]
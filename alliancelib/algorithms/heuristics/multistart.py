@@ -0,0 +1,172 @@
+# pylint: disable=C0103,R0913
+"""
+Runs many restarts of the cost reduction heuristic, spread across a pool of
+worker processes.
+
+Each restart draws from its own generator, seeded from a master seed, so it
+makes the same choices whichever process runs it.
+The size of the smallest alliance found so far is shared between all of them,
+and no restart lets its set grow to that size, as it couldn't improve on it.
+Every restart stops once an alliance of at most `target` vertices is found or
+the time budget runs out.
+
+With more than one worker, what a restart sees of the shared size depends on
+timing, so only a single worker reproduces a run exactly.
+"""
+import multiprocessing as mp
+import random
+import time
+from typing import Optional, Tuple
+
+from alliancelib.ds.types import Graph, NodeId
+from alliancelib.ds.shared import publish_graph, attach_graph
+from alliancelib.ds.vertex_set import VertexSet, Validation
+from alliancelib.ds.alliances.da import DefensiveAlliance
+from alliancelib.ds.alliances.conversion import convert_to_da
+
+from .cost_reduction import DACostReduction
+
+# steps a restart takes between checking the shared size and stopping
+# conditions.
+CHECK_INTERVAL = 32
+
+
+class _Restart:
+    """
+    Runs a restart, in whichever process has the graph.
+    """
+
+    def __init__(self, graph: Graph, r: int, steps: int, p_add: float,
+                 p_best: float, bound, stop, target: Optional[int],
+                 deadline: Optional[float]):
+        self.graph = graph
+        self.r = r
+        self.steps = steps
+        self.p_add = p_add
+        self.p_best = p_best
+        self.bound = bound
+        self.stop = stop
+        self.target = target
+        self.deadline = deadline
+
+    def stopped(self) -> bool:
+        """
+        Check if every restart should stop.
+        """
+        if self.stop.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.stop.set()
+            return True
+        return False
+
+    def found(self, size: int) -> None:
+        """
+        Share the size of an alliance that was found.
+        """
+        with self.bound.get_lock():
+            if size < self.bound.value:
+                self.bound.value = size
+        # nothing is smaller than a single vertex.
+        if size <= 1 or (self.target is not None and size <= self.target):
+            self.stop.set()
+
+    def __call__(self, seed: int) -> Optional[Tuple[NodeId, ...]]:
+        if self.stopped():
+            return None
+        solver = DACostReduction(
+            self.graph, self.p_add, self.p_best, self.r,
+            rng=random.Random(seed)
+        )
+        best: Optional[Tuple[NodeId, ...]] = None
+
+        for step in range(0, self.steps, CHECK_INTERVAL):
+            if self.stopped():
+                break
+            solver.max_size = self.bound.value - 1
+            if solver.max_size < 1:
+                break
+            solver.run(min(CHECK_INTERVAL, self.steps - step))
+
+            res = solver.best()
+            if res is not None and (best is None or len(res) < len(best)):
+                best = tuple(res)
+                self.found(len(best))
+
+        return best
+
+
+_restart: Optional[_Restart] = None
+
+
+def _init_worker(handle, *args) -> None:
+    # pylint: disable=W0603
+    global _restart
+    _restart = _Restart(attach_graph(handle), *args)
+
+
+def _run(seed: int) -> Optional[Tuple[NodeId, ...]]:
+    return _restart(seed)
+
+
+def multistart_reduce_cost(graph: Graph,
+                           r: int = -1,
+                           restarts: int = 16,
+                           workers: int = 1,
+                           seed: Optional[int] = None,
+                           steps: int = 1024,
+                           p_add: float = 0.9,
+                           p_best: float = 0.9,
+                           target: Optional[int] = None,
+                           time_limit: Optional[float] = None
+                           ) -> Optional[DefensiveAlliance]:
+    """
+    Run `restarts` restarts of `DACostReduction` for up to `steps` steps
+    each, across `workers` processes, and return the smallest
+    DefensiveAlliance any of them found.
+
+    Restarts are seeded from `seed`, and all stop early once an alliance of
+    at most `target` vertices is found, or after `time_limit` seconds.
+    """
+    master = random.Random(seed)
+    seeds = [master.getrandbits(64) for _ in range(restarts)]
+
+    ctx = mp.get_context('fork')
+    bound = ctx.Value('i', len(graph) + 1)
+    stop = ctx.Event()
+    deadline = None
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit
+    args = (r, steps, p_add, p_best, bound, stop, target, deadline)
+
+    shared = None
+    pool = None
+    if workers > 1:
+        shared = publish_graph(graph)
+        pool = ctx.Pool(workers, _init_worker, (shared.handle(), *args))
+        results = pool.imap_unordered(_run, seeds)
+    else:
+        results = map(_Restart(graph, *args), seeds)
+
+    best: Optional[Tuple[NodeId, ...]] = None
+    try:
+        # restarts still queued once stopped return straight away.
+        for res in results:
+            if res is not None and (best is None or len(res) < len(best)):
+                best = res
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if shared is not None:
+            shared.close()
+
+    if best is None:
+        return None
+    # the restart's accept_function has already validated it.
+    return convert_to_da(VertexSet(graph, set(best)), r, Validation.TRUSTED)
+
+
+__all__ = [
+    'multistart_reduce_cost'
+]
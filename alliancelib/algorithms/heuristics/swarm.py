@@ -1,13 +1,16 @@
 """
 Implementation of a Mealpy solver using ABC for Defensive Alliance
 """
+from functools import partial
+import numpy as np
+
 from alliancelib.ds.alliances.da import DefensiveAlliance
 from alliancelib.ds.vertex_set import ConstraintException
 from mealpy.swarm_based.ABC import OriginalABC
 from mealpy.swarm_based.BA import OriginalBA
 from mealpy.physics_based.SA import OriginalSA
 from mealpy.utils.problem import Problem
-from .cost_functions import da_score
+from .cost_functions import da_scores
 
 
 def clean_solution(solution):
@@ -81,10 +84,29 @@ class DefensiveAllianceProblem(Problem):
         self.name = name
 
     def fit_func(self, solution):
-        new_solution = clean_solution(solution)
-        score = da_score(self.g, new_solution, r=self.r)
-        size = len(new_solution)/self.vertex_count
-        return (score, size)
+        return self.fit_population([solution])[0]
+
+    def fit_population(self, solutions):
+        """
+        Evaluate a batch of solutions at once.
+        """
+        membership = np.asarray(solutions) >= 0.5
+        scores = da_scores(self.g, membership, r=self.r)
+        sizes = membership.sum(axis=1) / self.vertex_count
+        return list(zip(scores.tolist(), sizes.tolist()))
+
+
+def update_population(optimizer, pop):
+    """
+    Score a population with one call to its problem's `fit_population`, in
+    place of mealpy's `update_target_wrapper_population`.
+    """
+    problem = optimizer.problem
+    positions = [agent[optimizer.ID_POS] for agent in pop]
+    for agent, objs in zip(pop, problem.fit_population(positions)):
+        fit = np.dot(objs, problem.obj_weights)
+        agent[optimizer.ID_TAR] = [fit, list(objs)]
+    return pop
 
 
 class DAMetaHeuristic:
@@ -96,9 +118,22 @@ class DAMetaHeuristic:
         self.model = model
 
     def run(self, graph, generations=1000, r=-1, threads=8, time_limit=60):
+        """
+        Search for a DefensiveAlliance for up to `time_limit` seconds.
+
+        Each population is scored as one batch in this process, so `threads`
+        is unused.
+        """
         model = self.model(generations)
+        # in swarm mode each step's new agents are only scored once the step
+        # is done, all together, so they can be scored as a batch.
+        model.update_target_wrapper_population = partial(
+            update_population, model
+        )
 
-        problem = DefensiveAllianceProblem(graph, obj_weights=[1.0, 0.1])
+        problem = DefensiveAllianceProblem(
+            graph, r=r, obj_weights=[1.0, 0.1]
+        )
 
         term_dict = {
             "mode": "TB",
@@ -107,12 +142,17 @@ class DAMetaHeuristic:
 
         best_position, best_fitness = model.solve(
             problem,
-            n_workers=threads,
+            mode='swarm',
             termination=term_dict
         )
 
+        # positions are in the order of graph.nodes(), not node ids.
+        nodes = list(graph.nodes())
+        members = {nodes[idx] for idx in clean_solution(best_position)}
         try:
-            da = DefensiveAlliance(graph, clean_solution(best_position), r=r)
+            da = DefensiveAlliance(graph, members, r=r)
             print(f"Solution: {da}, Fitness: {best_fitness}")
         except ConstraintException:
             return None
+
+        return da
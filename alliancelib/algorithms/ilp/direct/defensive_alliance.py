@@ -10,7 +10,7 @@ from pulp.apis import LpSolver as Solver
 from alliancelib.ds.types import Graph
 from alliancelib.ds.alliances.da import \
     DefensiveAlliance, \
-    defensive_alliance_threshold
+    defensive_alliance_thresholds
 from alliancelib.ds.alliances.conversion import convert_to_da
 
 from .threshold_alliance import threshold_alliance_solver
@@ -30,10 +30,7 @@ def defensive_alliance_solver(graph: Graph,
     Find a defensive alliance in a graph.
     """
 
-    thresholds = {
-        node: defensive_alliance_threshold(graph, node, r)
-        for node in graph.nodes()
-    }
+    thresholds = defensive_alliance_thresholds(graph, r)
 
     status, alliance = threshold_alliance_solver(
         graph, thresholds, solver, solution_range
@@ -42,7 +39,7 @@ def defensive_alliance_solver(graph: Graph,
     converted = None
 
     if alliance:
-        converted = convert_to_da(alliance)
+        converted = convert_to_da(alliance, r)
 
     return (status, converted)
 
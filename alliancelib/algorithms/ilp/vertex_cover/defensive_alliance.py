@@ -9,7 +9,7 @@ from pulp.apis import LpSolver as Solver
 from alliancelib.ds.types import Graph
 from alliancelib.ds.alliances.da import \
     DefensiveAlliance, \
-    defensive_alliance_threshold
+    defensive_alliance_thresholds
 from alliancelib.ds.alliances.conversion import convert_to_da
 
 from .common import VertexCover
@@ -27,16 +27,13 @@ def defensive_alliance_solver(vertex_cover: VertexCover,
     """
     graph = vertex_cover.graph()
 
-    thresholds = {
-        node: defensive_alliance_threshold(graph, node, r)
-        for node in graph.nodes()
-    }
+    thresholds = defensive_alliance_thresholds(graph, r)
 
     alliance = threshold_alliance_solver(vertex_cover, thresholds, solver,
             solution_range, threads=threads)
 
     if alliance:
-        return convert_to_da(alliance)
+        return convert_to_da(alliance, r)
 
     return None
 
@@ -9,6 +9,8 @@ from pulp import LpProblem, LpVariable, LpMinimize, lpSum
 from pulp.apis import LpSolver as Solver
 
 from alliancelib.ds.types import Graph, NodeSet
+from alliancelib.ds.shared import publish_graph, attach_graph
+from alliancelib.ds.vertex_set import Validation
 from alliancelib.ds.alliances.common import \
     neighbours_in_set, \
     neighbours_in_set_count
@@ -139,6 +141,9 @@ def threshold_alliance_solver(vertex_cover: VertexCover,
     """
     Computes an alliance based of a known vertex cover.
     This has a O(2^vc * ILP), which isn't good!
+
+    The graph is published to shared memory once, and every worker attaches
+    to it.
     """
     graph = vertex_cover.graph()
     vc = vertex_cover.vertices()
@@ -161,81 +166,90 @@ def threshold_alliance_solver(vertex_cover: VertexCover,
         if max_size > solution_range[1]:
             max_size = solution_range[1]
 
-    for i in range(1, max_size):
-        work_queue = mp.JoinableQueue()
+    with publish_graph(graph) as shared:
+        for i in range(1, max_size):
+            work_queue = mp.JoinableQueue()
+
+            found_state = mp.Value('b', False)
+            manager = mp.Manager()
+            state = manager.dict()
+            state['alliance'] = []
+
+            def worker(s, q, fs, return_dict, handle):
+                shared_graph = attach_graph(handle)
+                while True:
+                    slected_vertices = None
+                    try:
+                        selected_vertices = q.get(timeout=1.0)
+                    except:
+                        break
+
+                    if fs.value:
+                        q.task_done()
+                        continue
+
+                    ns = neighbour_set(
+                        shared_graph, thresholds, vc, set(selected_vertices)
+                    )
 
-        found_state = mp.Value('b', False)
-        manager = mp.Manager()
-        state = manager.dict()
-        state['alliance'] = []
+                    if not ns:
+                        q.task_done()
+                        continue
 
-        def worker(s, q, fs, return_dict):
-            while True:
-                slected_vertices = None
-                try:
-                    selected_vertices = q.get(timeout=1.0)
-                except:
-                    break
+                    new_solution_range = (
+                        solution_range[0] - i,
+                        solution_range[1] - i
+                    )
 
-                if fs.value:
-                    q.task_done()
-                    continue
+                    model = vc_ilp_model(
+                        shared_graph,
+                        thresholds,
+                        set(selected_vertices),
+                        ns,
+                        solution_range=new_solution_range
+                    )
+                    s.solve(model)
 
-                ns = neighbour_set(
-                    graph, thresholds, vc, set(selected_vertices)
-                )
+                    if valid_solution(model.status):
+                        fs.value = True
+                        alliance = model_to_alliance(
+                            shared_graph, thresholds, model,
+                            set(selected_vertices), ns
+                        )
+                        return_dict['alliance'] = alliance.vertices()
 
-                if not ns:
                     q.task_done()
-                    continue
-
-                new_solution_range = (
-                    solution_range[0] - i,
-                    solution_range[1] - i
-                )
 
-                model = vc_ilp_model(
-                    graph,
-                    thresholds,
-                    set(selected_vertices),
-                    ns,
-                    solution_range=new_solution_range
-                )
-                s.solve(model)
-
-                if valid_solution(model.status):
-                    fs.value = True
-                    alliance = model_to_alliance(
-                        graph, thresholds, model, set(selected_vertices), ns
-                    )
-                    return_dict['alliance'] = alliance.vertices()
-
-                q.task_done()
+            for selected_vertices in combinations(vc, i):
+                # add to queue
 
-        for selected_vertices in combinations(vc, i):
-            # add to queue
+                # now convert the results into a threshold alliance.
 
-            # now convert the results into a threshold alliance.
+                # return model_to_alliance(
+                #    graph, thresholds, model, set(selected_vertices), ns
+                # )
+                work_queue.put(selected_vertices)
 
-            # return model_to_alliance(
-            #    graph, thresholds, model, set(selected_vertices), ns
-            # )
-            work_queue.put(selected_vertices)
-
-        processes = []
-        for j in range(threads):
-            p = mp.Process(
-                target=worker,
-                daemon=True,
-                args=(solver[j], work_queue, found_state, state)
-            )
-            processes.append(p)
-            p.start()
+            processes = []
+            for j in range(threads):
+                p = mp.Process(
+                    target=worker,
+                    daemon=True,
+                    args=(
+                        solver[j], work_queue, found_state, state,
+                        shared.handle()
+                    )
+                )
+                processes.append(p)
+                p.start()
 
-        [process.join() for process in processes]
+            [process.join() for process in processes]
 
-        if found_state.value:
-            return ThresholdAlliance(graph, state['alliance'], thresholds)
+            if found_state.value:
+                # the worker already validated this when it built the alliance.
+                return ThresholdAlliance(
+                    graph, state['alliance'], thresholds, Validation.TRUSTED
+                )
 
     return None
 
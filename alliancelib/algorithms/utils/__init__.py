@@ -0,0 +1,4 @@
+"""
+Utilities shared between algorithms.
+"""
+from .twins import *
@@ -0,0 +1,67 @@
+# pylint: disable=C0103
+"""
+Structural twin classes, for pruning symmetric branches of exact searches.
+
+Two vertices are twins if they have the same open neighbourhood (and aren't
+adjacent) or the same closed neighbourhood (and are adjacent).
+Swapping a pair of twins is an automorphism of the graph, so if they also
+have the same threshold, a set containing one but not the other is an
+alliance exactly when the set with them swapped is.
+A search that only wants to know if a solution exists can then try one
+vertex from each class of twins at each choice, rather than all of them.
+
+Full automorphism orbits would catch more symmetry, but pruning with them
+needs more than one representative per choice to stay exact, so only twins
+are used.
+"""
+from collections.abc import Mapping
+from typing import Dict, Hashable, Optional
+
+from alliancelib.ds.types import Graph, NodeId
+
+# Maps a vertex to the id of its twin class.
+TwinClasses = Dict[NodeId, int]
+
+
+def twin_classes(graph: Graph,
+                 thresholds: Optional[Mapping] = None) -> TwinClasses:
+    """
+    Group the vertices of `graph` into classes of twins, which also share a
+    threshold if `thresholds` is given.
+
+    A vertex can't have both an open and a closed twin, so the two relations
+    don't overlap, and this is O(m).
+    """
+    def threshold(vertex: NodeId):
+        return thresholds[vertex] if thresholds is not None else None
+
+    open_keys: Dict[NodeId, Hashable] = {}
+    groups: Dict[Hashable, int] = {}
+    for vertex in graph.nodes():
+        neighbours = frozenset(graph.neighbors(vertex))
+        key = ('open', neighbours, threshold(vertex))
+        open_keys[vertex] = key
+        groups[key] = groups.get(key, 0) + 1
+
+    classes: TwinClasses = {}
+    ids: Dict[Hashable, int] = {}
+    for vertex, key in open_keys.items():
+        if groups[key] == 1:
+            key = ('closed', key[1] | {vertex}, key[2])
+        classes[vertex] = ids.setdefault(key, len(ids))
+
+    return classes
+
+
+def has_twins(classes: TwinClasses) -> bool:
+    """
+    Check if any class has more than one vertex, so pruning can help.
+    """
+    return len(set(classes.values())) < len(classes)
+
+
+__all__ = [
+    'TwinClasses',
+    'twin_classes',
+    'has_twins'
+]
@@ -9,7 +9,7 @@ from z3 import Solver
 from alliancelib.ds.types import Graph
 from alliancelib.ds.alliances.da import \
     DefensiveAlliance, \
-    defensive_alliance_threshold
+    defensive_alliance_thresholds
 from alliancelib.ds.alliances.conversion import convert_to_da
 
 from .threshold_alliance import threshold_alliance_solver
@@ -29,10 +29,7 @@ def defensive_alliance_solver(solver: Solver,
     Find a defensive alliance in a graph.
     """
 
-    thresholds = {
-        node: defensive_alliance_threshold(graph, node, r)
-        for node in graph.nodes()
-    }
+    thresholds = defensive_alliance_thresholds(graph, r)
 
     status, alliance = threshold_alliance_solver(
         solver, graph, thresholds, solution_range
@@ -41,7 +38,7 @@ def defensive_alliance_solver(solver: Solver,
     converted = None
 
     if alliance:
-        converted = convert_to_da(alliance)
+        converted = convert_to_da(alliance, r)
 
     return (status, converted)
 
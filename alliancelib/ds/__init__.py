@@ -4,3 +4,7 @@ Data structures
 from alliancelib.ds.alliances import *
 from alliancelib.ds.vertex_set import *
 from alliancelib.ds.types import *
+from alliancelib.ds.csr import *
+from alliancelib.ds.cache import *
+from alliancelib.ds.bit_vertex_set import *
+from alliancelib.ds.shared import *
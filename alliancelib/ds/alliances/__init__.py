@@ -5,6 +5,8 @@ import alliancelib.ds.alliances.da
 import alliancelib.ds.alliances.threshold
 import alliancelib.ds.alliances.gmda
 import alliancelib.ds.alliances.lmda
+import alliancelib.ds.alliances.incremental
+import alliancelib.ds.alliances.batch
 
 import alliancelib.ds.alliances.common
 import alliancelib.ds.alliances.conversion
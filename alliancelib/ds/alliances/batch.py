@@ -0,0 +1,110 @@
+# pylint: disable=C0103
+"""
+Vectorised verification of many candidate sets against the same graph.
+
+Candidates are given as a 0/1 membership matrix, with one row per candidate
+and one column per vertex, in the order of `graph.nodes()`.
+In-set neighbour counts for every candidate come from a single sparse
+adjacency x indicator product over the CSR arrays, so checking thousands of
+candidates is a handful of numpy operations rather than thousands of python
+loops.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+from alliancelib.ds.types import Graph
+from alliancelib.ds.cache import cached_csr_graph
+
+from .threshold import ThresholdTable
+from .da import defensive_alliance_thresholds
+
+# Upper bound on the number of entries in the temporary gathered array, so
+# large populations get processed in blocks.
+BLOCK_ENTRIES = 1 << 24
+
+
+def neighbour_counts(graph: Graph, membership: np.ndarray) -> np.ndarray:
+    """
+    For each candidate (row) and vertex (column), count the neighbours of the
+    vertex that are in the candidate.
+    """
+    csr = cached_csr_graph(graph)
+    membership = np.atleast_2d(np.asarray(membership))
+    candidates, n = membership.shape
+    if n != csr.number_of_nodes():
+        raise ValueError('membership needs one column per vertex')
+
+    offsets = csr.offsets()
+    targets = csr.targets()
+    degrees = np.diff(offsets)
+    sources = np.repeat(np.arange(n), degrees)
+
+    # self loops don't count as a neighbour in the set.
+    keep = sources != targets
+    sources = sources[keep]
+    targets = targets[keep]
+
+    degrees = np.bincount(sources, minlength=n)
+    nonempty = degrees > 0
+    starts = (np.cumsum(degrees) - degrees)[nonempty]
+
+    counts = np.zeros((candidates, n), dtype=np.int32)
+    if len(targets) == 0:
+        return counts
+
+    block = max(1, BLOCK_ENTRIES // len(targets))
+    for lo in range(0, candidates, block):
+        gathered = membership[lo:lo + block, targets].astype(np.int32)
+        counts[lo:lo + block, nonempty] = np.add.reduceat(
+            gathered, starts, axis=1
+        )
+
+    return counts
+
+
+def verify_threshold_alliances(graph: Graph,
+                               membership: np.ndarray,
+                               thresholds: Mapping
+                               ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Check a batch of candidate sets against per-vertex thresholds.
+
+    Returns a boolean array of which candidates are (non-empty) alliances, and
+    an integer array of each candidates deficit (the number of neighbours its
+    members are missing, as `da_score` computes).
+    """
+    membership = np.atleast_2d(np.asarray(membership)).astype(bool)
+
+    if isinstance(thresholds, ThresholdTable):
+        threshold_array = thresholds.array()
+    else:
+        threshold_array = np.array(
+            [thresholds[node] for node in graph.nodes()], dtype=np.int32
+        )
+
+    counts = neighbour_counts(graph, membership)
+    missing = np.clip(threshold_array - counts, 0, None)
+    deficits = np.where(membership, missing, 0).sum(axis=1)
+    valid = (deficits == 0) & membership.any(axis=1)
+
+    return (valid, deficits)
+
+
+def verify_defensive_alliances(graph: Graph,
+                               membership: np.ndarray,
+                               r: int = -1
+                               ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Check a batch of candidate sets for being r-Defensive Alliances.
+    """
+    return verify_threshold_alliances(
+        graph, membership, defensive_alliance_thresholds(graph, r)
+    )
+
+
+__all__ = [
+    'neighbour_counts',
+    'verify_threshold_alliances',
+    'verify_defensive_alliances'
+]
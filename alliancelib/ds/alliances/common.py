@@ -1,7 +1,7 @@
 """
 Common functions that get used a lot.
 """
-from collections.abc import Callable
+from collections.abc import Callable, Mapping, Set
 
 from alliancelib.ds.types import NodeId, Graph, NodeSet
 
@@ -12,11 +12,17 @@ def neighbours_in_set(graph: Graph, node: NodeId, nodeset: NodeSet) -> NodeSet:
     """
     Find a set of neighbours in the nodeset for `node`.
     """
-    res: NodeSet = set()
-    for potential_neighbour in filter(lambda x: x != node, nodeset):
-        if graph.has_edge(node, potential_neighbour):
-            res = res.union({potential_neighbour})
-    return res
+    if isinstance(nodeset, Set):
+        return {
+            neighbour for neighbour in graph.neighbors(node)
+            if neighbour != node and neighbour in nodeset
+        }
+
+    return {
+        potential_neighbour
+        for potential_neighbour in filter(lambda x: x != node, nodeset)
+        if graph.has_edge(node, potential_neighbour)
+    }
 
 
 def neighbours_in_set_count(graph: Graph,
@@ -25,15 +31,62 @@ def neighbours_in_set_count(graph: Graph,
                             ) -> int:
     """
     Find the number of neighbours `node` has in `nodeset`.
+
+    This walks the neighbourhood of `node`, so is O(deg(node)) when `nodeset`
+    supports constant time membership tests.
+    Other containers fall back to testing each member for an edge.
     """
+    if isinstance(nodeset, Set):
+        return sum(
+            1 for neighbour in graph.neighbors(node)
+            if neighbour != node and neighbour in nodeset
+        )
+
     return sum(
         graph.has_edge(node, potential_neighbour)
         for potential_neighbour in filter(lambda x: x != node, nodeset)
     )
 
 
+def threshold_core(graph: Graph,
+                   thresholds: Mapping,
+                   nodes: NodeSet
+                   ) -> NodeSet:
+    """
+    Find the largest subset of `nodes` where every vertex has at least its
+    threshold of neighbours in the subset.
+
+    This peels vertices off with a worklist, decrementing the counts of their
+    neighbours as they go, like a k-core decomposition. It runs in O(sum of
+    the degrees of `nodes`), and works for any per-vertex thresholds.
+    """
+    members = set(nodes)
+    counts = {
+        vertex: neighbours_in_set_count(graph, vertex, members)
+        for vertex in members
+    }
+
+    doomed = {
+        vertex for vertex in members if counts[vertex] < thresholds[vertex]
+    }
+    queue = list(doomed)
+
+    while queue:
+        vertex = queue.pop()
+        for neighbour in graph.neighbors(vertex):
+            if neighbour not in members or neighbour in doomed:
+                continue
+            counts[neighbour] -= 1
+            if counts[neighbour] < thresholds[neighbour]:
+                doomed.add(neighbour)
+                queue.append(neighbour)
+
+    return members - doomed
+
+
 __all__ = [
     'neighbours_in_set',
     'neighbours_in_set_count',
+    'threshold_core',
     'ProtectionFunction'
 ]
@@ -2,28 +2,54 @@
 """
 Conversion utilities
 """
-from alliancelib.ds.vertex_set import VertexSet
+from typing import Optional
 
-from .da import DefensiveAlliance
+from alliancelib.ds.vertex_set import VertexSet, Validation
+
+from .threshold import ThresholdAlliance
+from .da import DefensiveAlliance, defensive_alliance_thresholds
 from .gmda import GloballyMinimalDefensiveAlliance
 
 
+def already_validated(vs: VertexSet, r: int = -1) -> bool:
+    """
+    Check if `vs` has already been validated against the r-Defensive Alliance
+    thresholds, so converting it doesn't need to check it again.
+    """
+    return isinstance(vs, ThresholdAlliance) \
+        and vs.validated() \
+        and vs.thresholds() is defensive_alliance_thresholds(vs.graph(), r)
+
+
 # Conversion functions
 
-def convert_to_da(vs: VertexSet, r: int = -1) -> DefensiveAlliance:
+def convert_to_da(vs: VertexSet,
+                  r: int = -1,
+                  validation: Optional[Validation] = None
+                  ) -> DefensiveAlliance:
     """
     Convert a VertexSet to a DefensiveAlliance
+
+    If no validation policy is given, sets that were already validated against
+    the same thresholds are trusted, and everything else is checked.
     """
-    return DefensiveAlliance(vs.graph(), vs.vertices(), r)
+    vertices = vs.vertices()
+    if validation is None:
+        validation = Validation.TRUSTED if already_validated(vs, r) \
+            else Validation.EAGER
+    return DefensiveAlliance(vs.graph(), vertices, r, validation)
 
 
 def convert_to_gmda(vs: VertexSet,
-                    r: int = -1
+                    r: int = -1,
+                    validation: Validation = Validation.EAGER
                     ) -> GloballyMinimalDefensiveAlliance:
     """
     Convert a VertexSet to a DefensiveAlliance
     """
-    return GloballyMinimalDefensiveAlliance(vs.graph(), vs.vertices(), r)
+    return GloballyMinimalDefensiveAlliance(
+        vs.graph(), vs.vertices(), r, validation
+    )
 
 
 __all__ = [
@@ -4,10 +4,14 @@ Defensive Alliance representation
 """
 import math
 
+import numpy as np
+
 from alliancelib.ds.types import NodeId, Graph, NodeSet
-from alliancelib.ds.vertex_set import ConstraintException
+from alliancelib.ds.csr import CSRGraph
+from alliancelib.ds.cache import graph_cache
+from alliancelib.ds.vertex_set import ConstraintException, Validation
 
-from .threshold import ThresholdAlliance
+from .threshold import ThresholdAlliance, ThresholdTable
 from .common import neighbours_in_set_count
 
 
@@ -18,7 +22,7 @@ def defensive_alliance_threshold(graph: Graph,
     """
     Compute the threshold for a r-Defensive Alliance
     """
-    neighbour_count = len(list(graph.neighbors(node)))
+    neighbour_count = len(graph[node])
     # The iterative, somewhat more initutive approach is:
     # for i in range(0, neighbour_count + 1):
     #    if i >= ((neighbour_count - i) + r):
@@ -27,6 +31,28 @@ def defensive_alliance_threshold(graph: Graph,
     return math.ceil((neighbour_count + r) / 2)
 
 
+def defensive_alliance_thresholds(graph: Graph, r: int = -1) -> ThresholdTable:
+    """
+    Thresholds for every vertex in a r-Defensive Alliance.
+
+    Computed once per (graph, r) and cached until the graph is mutated.
+    """
+    cache = graph_cache(graph)
+    key = ('defensive_alliance_thresholds', r)
+    if key not in cache:
+        if isinstance(graph, CSRGraph):
+            degrees = np.diff(graph.offsets())
+        else:
+            degrees = np.fromiter(
+                (len(graph[node]) for node in graph.nodes()),
+                dtype=np.int64,
+                count=graph.number_of_nodes()
+            )
+        # ceil((d + r) / 2), in integer arithmetic.
+        cache[key] = ThresholdTable(graph, (degrees + r + 1) // 2)
+    return cache[key]
+
+
 def da_is_protected(graph: Graph, node: NodeId, nodes: NodeSet, r: int = -1):
     """
     Check if a vertex is protected.
@@ -44,15 +70,23 @@ class DefensiveAlliance(ThresholdAlliance):
     Validated representation of a defensive alliance.
     """
 
-    def __init__(self, graph: Graph, indices: NodeSet, r: int = -1):
+    def __init__(self,
+                 graph: Graph,
+                 indices: NodeSet,
+                 r: int = -1,
+                 validation: Validation = Validation.EAGER):
         if len(indices) == 0:
             raise ConstraintException
 
-        thresholds = {
-            node: defensive_alliance_threshold(graph, node, r)
-            for node in graph.nodes()
-        }
-        super().__init__(graph, indices, thresholds)
+        self._r = r
+        thresholds = defensive_alliance_thresholds(graph, r)
+        super().__init__(graph, indices, thresholds, validation)
+
+    def r(self) -> int:
+        """
+        Return r.
+        """
+        return self._r
 
 
 # Test functions
@@ -71,6 +105,7 @@ def is_defensive_alliance(graph: Graph, nodes: NodeSet, r: int) -> bool:
 __all__ = [
     'DefensiveAlliance',
     'defensive_alliance_threshold',
+    'defensive_alliance_thresholds',
     'is_defensive_alliance',
     'da_is_protected'
 ]
@@ -2,19 +2,27 @@
 """
 Globally Minimal Defensive Alliance Representation
 """
-from itertools import combinations
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Tuple
 
-from alliancelib.ds.types import NodeId, Graph, NodeSet
+from alliancelib.ds.types import Graph, NodeId, NodeSet
+from alliancelib.ds.vertex_set import Validation
 
-from .da import DefensiveAlliance, da_is_protected
-from .common import ProtectionFunction
+from .da import DefensiveAlliance, defensive_alliance_thresholds
+from .common import ProtectionFunction, neighbours_in_set_count
 
 
 class NotGloballyMinimal(Exception):
     """
     Exception if an alliance is not Globally Minimal.
+
+    `witness` is a smaller alliance contained in it, if known.
     """
 
+    def __init__(self, witness: Optional[NodeSet] = None):
+        super().__init__(witness)
+        self.witness = witness
+
 
 def chisel(graph: Graph,
            protected: ProtectionFunction,
@@ -22,21 +30,110 @@ def chisel(graph: Graph,
            ) -> NodeSet:
     """
     Remove unprotected vertices.
+
+    Whether a vertex is protected should only depend on its neighbours in the
+    set, so only the neighbours of a removed vertex get checked again.
+    If you have thresholds, `threshold_core` does the same thing in linear
+    time.
     """
-    prev: NodeSet = set()
-    curr: NodeSet = nodes
+    curr: NodeSet = set(nodes)
+
+    queue = list(curr)
+    queued = set(curr)
 
     # find and remove all the unprotected vertices.
-    while prev != curr:
-        prev = curr
-        curr = set(filter(
-            lambda v: protected(graph, v, curr),
-            curr
-        ))
+    while queue:
+        vertex = queue.pop()
+        queued.discard(vertex)
+        if protected(graph, vertex, curr):
+            continue
+
+        curr.remove(vertex)
+        for neighbour in graph.neighbors(vertex):
+            if neighbour in curr and neighbour not in queued:
+                queued.add(neighbour)
+                queue.append(neighbour)
 
     return curr
 
 
+def removal_cascade(graph: Graph,
+                    thresholds: Mapping,
+                    members: NodeSet,
+                    counts: Mapping,
+                    removed: NodeSet
+                    ) -> NodeSet:
+    """
+    Return `removed`, along with every member of `members` that ends up
+    unprotected once they are all gone.
+
+    `counts` are the neighbour counts of the members in `members`, which are
+    left untouched, as only the decrements are recorded, so this costs the
+    sum of the degrees of the vertices it returns.
+    """
+    doomed = set(removed)
+    queue = list(doomed)
+    lost: Dict = {}
+
+    while queue:
+        vertex = queue.pop()
+        for neighbour in graph.neighbors(vertex):
+            if neighbour not in members or neighbour in doomed:
+                continue
+            missing = lost.get(neighbour, 0) + 1
+            lost[neighbour] = missing
+            if counts[neighbour] - missing < thresholds[neighbour]:
+                doomed.add(neighbour)
+                queue.append(neighbour)
+
+    return doomed
+
+
+def reduced_subsets(graph: Graph,
+                    thresholds: Mapping,
+                    nodes: NodeSet
+                    ) -> Iterator[Tuple[NodeId, NodeSet]]:
+    """
+    For each vertex v in `nodes`, yield v and the largest alliance in
+    `nodes - {v}`, which is empty if there isn't one.
+
+    The neighbour counts for `nodes` are computed once and shared by each
+    `removal_cascade`.
+    """
+    members = set(nodes)
+    counts = {
+        vertex: neighbours_in_set_count(graph, vertex, members)
+        for vertex in members
+    }
+    unprotected = {
+        vertex for vertex in members if counts[vertex] < thresholds[vertex]
+    }
+
+    for start in members:
+        doomed = removal_cascade(
+            graph, thresholds, members, counts, unprotected | {start}
+        )
+        yield (start, members - doomed)
+
+
+def globally_minimal_witness(graph: Graph,
+                             thresholds: Mapping,
+                             nodes: NodeSet
+                             ) -> Optional[NodeSet]:
+    """
+    Find a non-empty alliance that is a proper subset of `nodes`, or None if
+    there isn't one.
+
+    Every proper sub-alliance survives peeling `nodes - {v}` for some v, so
+    this runs one removal cascade per vertex, with `reduced_subsets`.
+    """
+    for _, res in reduced_subsets(graph, thresholds, nodes):
+        if res:
+            return res
+
+    return None
+
+
 class GloballyMinimalDefensiveAlliance(DefensiveAlliance):
     """
     Validated representation of a Globally Minimal Defensive Alliance.
@@ -45,19 +142,28 @@ class GloballyMinimalDefensiveAlliance(DefensiveAlliance):
     Alliance.
     """
 
-    def __init__(self, graph: Graph, indices: NodeSet, r: int = -1):
-        super().__init__(graph, indices, r)
+    def __init__(self,
+                 graph: Graph,
+                 indices: NodeSet,
+                 r: int = -1,
+                 validation: Validation = Validation.EAGER):
+        super().__init__(graph, indices, r, validation)
 
-        def protection_function(g: Graph, n: NodeId, ns: NodeSet):
-            return da_is_protected(g, n, ns, r)
+    def check(self) -> None:
+        super().check()
 
-        for test in combinations(indices, len(indices) - 1):
-            if chisel(graph, protection_function, set(test)) != set():
-                raise NotGloballyMinimal()
+        witness = globally_minimal_witness(
+            self._graph, self._thresholds, self._unchecked
+        )
+        if witness is not None:
+            raise NotGloballyMinimal(witness)
 
 
 __all__ = [
     'GloballyMinimalDefensiveAlliance',
     'NotGloballyMinimal',
-    'chisel'
+    'chisel',
+    'removal_cascade',
+    'reduced_subsets',
+    'globally_minimal_witness'
 ]
@@ -0,0 +1,281 @@
+# pylint: disable=C0103
+"""
+Incrementally maintained alliance state, for local search and branching.
+
+Tracks, for every vertex, how many of its neighbours are in the set, which
+members are currently unprotected, and the total deficit (the number of extra
+neighbours the members need, which is what `da_score` computes).
+Adding or removing a vertex only touches its neighbourhood, so costs
+O(deg(v)).
+
+Changes are recorded on a trail, so search code can take a `snapshot()` and
+`undo()` back to it when backtracking instead of copying the state.
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from alliancelib.ds.types import NodeId, Graph, NodeSet
+
+from .da import defensive_alliance_thresholds
+from .threshold import ThresholdAlliance
+
+
+class IncrementalAlliance:
+    """
+    A set of vertices that keeps track of how protected each member is as
+    vertices are added and removed.
+    """
+
+    def __init__(self,
+                 graph: Graph,
+                 thresholds: Mapping,
+                 indices: Iterable[NodeId] = ()):
+        self._graph = graph
+        self._thresholds = thresholds
+
+        self._members: Set[NodeId] = set()
+        # Only vertices with at least one neighbour in the set have an entry.
+        self._counts: Dict[NodeId, int] = {}
+        self._unprotected: Set[NodeId] = set()
+        self._deficit = 0
+
+        self._trail: List[Tuple[bool, NodeId]] = []
+
+        for vertex in indices:
+            self.add(vertex)
+
+    @classmethod
+    def defensive(cls,
+                  graph: Graph,
+                  r: int = -1,
+                  indices: Iterable[NodeId] = ()
+                  ) -> 'IncrementalAlliance':
+        """
+        Incremental state for a r-Defensive Alliance.
+        """
+        return cls(graph, defensive_alliance_thresholds(graph, r), indices)
+
+    def graph(self) -> Graph:
+        """
+        Return the graph.
+        """
+        return self._graph
+
+    def thresholds(self) -> Mapping:
+        """
+        Return the thresholds the state is checked against.
+        """
+        return self._thresholds
+
+    def vertices(self) -> NodeSet:
+        """
+        Return a copy of the current members.
+        """
+        return set(self._members)
+
+    def count(self, vertex: NodeId) -> int:
+        """
+        Number of neighbours `vertex` has in the set.
+        """
+        return self._counts.get(vertex, 0)
+
+    def slack(self, vertex: NodeId) -> int:
+        """
+        How many more in-set neighbours `vertex` has than it needs.
+        Negative if it would be unprotected.
+        """
+        return self._counts.get(vertex, 0) - self._thresholds[vertex]
+
+    def unprotected(self) -> Set[NodeId]:
+        """
+        The members that don't currently have enough neighbours in the set.
+
+        This is the live set, so don't modify it.
+        """
+        return self._unprotected
+
+    def deficit(self) -> int:
+        """
+        Total number of neighbours the unprotected members are missing.
+        """
+        return self._deficit
+
+    def is_alliance(self) -> bool:
+        """
+        Check if the set is currently a non-empty alliance, in O(1).
+        """
+        return len(self._members) > 0 and len(self._unprotected) == 0
+
+    def is_alliance_with(self, vertex: NodeId) -> bool:
+        """
+        Check if the set would be an alliance with `vertex` added, without
+        adding it.
+        Costs O(|unprotected|) edge lookups.
+        """
+        if vertex in self._members:
+            return self.is_alliance()
+        if self._counts.get(vertex, 0) < self._thresholds[vertex]:
+            return False
+        # every unprotected member must be exactly one short, and `vertex`
+        # must be the neighbour it is missing.
+        thresholds = self._thresholds
+        counts = self._counts
+        has_edge = self._graph.has_edge
+        for member in self._unprotected:
+            if counts.get(member, 0) + 1 < thresholds[member]:
+                return False
+            if member == vertex or not has_edge(member, vertex):
+                return False
+        return True
+
+    def add_delta(self, vertex: NodeId) -> int:
+        """
+        Change in deficit if `vertex` were added, without adding it.
+        """
+        thresholds = self._thresholds
+        counts = self._counts
+        members = self._members
+
+        own = thresholds[vertex] - counts.get(vertex, 0)
+        delta = own if own > 0 else 0
+        for neighbour in self._graph.neighbors(vertex):
+            if neighbour == vertex or neighbour not in members:
+                continue
+            if counts.get(neighbour, 0) < thresholds[neighbour]:
+                delta -= 1
+        return delta
+
+    def remove_delta(self, vertex: NodeId) -> int:
+        """
+        Change in deficit if `vertex` were removed, without removing it.
+        """
+        thresholds = self._thresholds
+        counts = self._counts
+        members = self._members
+
+        own = thresholds[vertex] - counts.get(vertex, 0)
+        delta = -own if own > 0 else 0
+        for neighbour in self._graph.neighbors(vertex):
+            if neighbour == vertex or neighbour not in members:
+                continue
+            if counts.get(neighbour, 0) <= thresholds[neighbour]:
+                delta += 1
+        return delta
+
+    def add(self, vertex: NodeId) -> None:
+        """
+        Add a vertex to the set, in O(deg(vertex)).
+        """
+        if vertex in self._members:
+            return
+        self._add(vertex)
+        self._trail.append((True, vertex))
+
+    def remove(self, vertex: NodeId) -> None:
+        """
+        Remove a vertex from the set, in O(deg(vertex)).
+        """
+        if vertex not in self._members:
+            return
+        self._remove(vertex)
+        self._trail.append((False, vertex))
+
+    def snapshot(self) -> int:
+        """
+        Mark the current state, so it can be returned to with `undo()`.
+        """
+        return len(self._trail)
+
+    def undo(self, mark: int) -> None:
+        """
+        Revert every change made since `snapshot()` returned `mark`.
+        """
+        trail = self._trail
+        while len(trail) > mark:
+            added, vertex = trail.pop()
+            if added:
+                self._remove(vertex)
+            else:
+                self._add(vertex)
+
+    def commit(self) -> None:
+        """
+        Forget the trail, making the current state permanent.
+        """
+        self._trail.clear()
+
+    def to_alliance(self) -> ThresholdAlliance:
+        """
+        Convert the current members into a validated ThresholdAlliance.
+        """
+        return ThresholdAlliance(
+            self._graph, self.vertices(), self._thresholds
+        )
+
+    def _add(self, vertex: NodeId) -> None:
+        thresholds = self._thresholds
+        counts = self._counts
+        members = self._members
+
+        members.add(vertex)
+        missing = thresholds[vertex] - counts.get(vertex, 0)
+        if missing > 0:
+            self._unprotected.add(vertex)
+            self._deficit += missing
+
+        for neighbour in self._graph.neighbors(vertex):
+            if neighbour == vertex:
+                continue
+            count = counts.get(neighbour, 0) + 1
+            counts[neighbour] = count
+            if neighbour not in members:
+                continue
+            threshold = thresholds[neighbour]
+            if count <= threshold:
+                self._deficit -= 1
+                if count == threshold:
+                    self._unprotected.discard(neighbour)
+
+    def _remove(self, vertex: NodeId) -> None:
+        thresholds = self._thresholds
+        counts = self._counts
+        members = self._members
+
+        members.remove(vertex)
+        missing = thresholds[vertex] - counts.get(vertex, 0)
+        if missing > 0:
+            self._unprotected.discard(vertex)
+            self._deficit -= missing
+
+        for neighbour in self._graph.neighbors(vertex):
+            if neighbour == vertex:
+                continue
+            count = counts[neighbour] - 1
+            if count:
+                counts[neighbour] = count
+            else:
+                del counts[neighbour]
+            if neighbour not in members:
+                continue
+            threshold = thresholds[neighbour]
+            if count < threshold:
+                self._deficit += 1
+                if count == threshold - 1:
+                    self._unprotected.add(neighbour)
+
+    def __contains__(self, vertex: NodeId) -> bool:
+        return vertex in self._members
+
+    def __iter__(self) -> Iterator[NodeId]:
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __str__(self) -> str:
+        return type(self).__name__ + str(self._members)
+
+
+__all__ = [
+    'IncrementalAlliance'
+]
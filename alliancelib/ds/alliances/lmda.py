@@ -2,18 +2,68 @@
 """
 Locally Minimal Defensive Alliance
 """
-from itertools import combinations
+from collections.abc import Mapping
+from typing import Optional
 
 from alliancelib.ds.types import Graph, NodeSet
-from alliancelib.ds.vertex_set import ConstraintException
+from alliancelib.ds.vertex_set import Validation
 
 from .da import DefensiveAlliance
+from .common import neighbours_in_set_count
 
 
 class NotLocallyMinimal(Exception):
     """
     Exception if an alliance is not Locally Minimal.
+
+    `witness` is an alliance with one vertex fewer, if known.
+    """
+
+    def __init__(self, witness: Optional[NodeSet] = None):
+        super().__init__(witness)
+        self.witness = witness
+
+
+def locally_minimal_witness(graph: Graph,
+                            thresholds: Mapping,
+                            nodes: NodeSet
+                            ) -> Optional[NodeSet]:
+    """
+    Find a vertex that can be removed from `nodes` leaving a (non-empty)
+    alliance, and return that smaller alliance.
+    Returns None if there isn't one.
+
+    Removing v only changes the counts of v's neighbours, so S - {v} is an
+    alliance exactly when every other unprotected member is gone and each of
+    v's neighbours in S has a spare neighbour.
+    This is O(sum of degrees), rather than building |S| alliances.
     """
+    members = set(nodes)
+    if len(members) <= 1:
+        return None
+
+    counts = {
+        vertex: neighbours_in_set_count(graph, vertex, members)
+        for vertex in members
+    }
+    unprotected = [
+        vertex for vertex in members if counts[vertex] < thresholds[vertex]
+    ]
+
+    # removing a single vertex can only fix the vertex being removed.
+    if len(unprotected) > 1:
+        return None
+    candidates = unprotected if unprotected else members
+
+    for vertex in candidates:
+        if all(
+            counts[neighbour] > thresholds[neighbour]
+            for neighbour in graph.neighbors(vertex)
+            if neighbour != vertex and neighbour in members
+        ):
+            return members - {vertex}
+
+    return None
 
 
 class LocallyMinimalDefensiveAlliance(DefensiveAlliance):
@@ -24,17 +74,22 @@ class LocallyMinimalDefensiveAlliance(DefensiveAlliance):
     result in another Defensive Alliance.
     """
 
-    def __init__(self, graph: Graph, indices: NodeSet, r: int = -1):
-        # attempt to create a Defensive Alliance based on the combinations of
-        # vertices.
-        # if one exists, we need to raise an exception
-        for indices_set in combinations(indices, len(indices) - 1):
-            try:
-                DefensiveAlliance(graph, set(indices_set), r)
-                raise NotLocallyMinimal()
-            except ConstraintException:
-                continue
-        super().__init__(graph, indices, r)
+    def __init__(self,
+                 graph: Graph,
+                 indices: NodeSet,
+                 r: int = -1,
+                 validation: Validation = Validation.EAGER):
+        super().__init__(graph, indices, r, validation)
+
+    def check(self) -> None:
+        # if removing any single vertex leaves a Defensive Alliance, we need
+        # to raise an exception
+        witness = locally_minimal_witness(
+            self._graph, self._thresholds, self._unchecked
+        )
+        if witness is not None:
+            raise NotLocallyMinimal(witness)
+        super().check()
 
 
 class NotGloballyMinimal(Exception):
@@ -45,5 +100,6 @@ class NotGloballyMinimal(Exception):
 
 __all__ = [
     'LocallyMinimalDefensiveAlliance',
-    'NotLocallyMinimal'
+    'NotLocallyMinimal',
+    'locally_minimal_witness'
 ]
@@ -1,16 +1,63 @@
 """
 Threshold Alliance Representation
 """
-from typing import Dict
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
 
 from alliancelib.ds.types import NodeId, Graph, NodeSet
+from alliancelib.ds.csr import CSRGraph
 from alliancelib.ds.vertex_set import \
     ConstrainedVertexSet, \
-    VertexConstraint
+    VertexConstraint, \
+    Validation
 
 from .common import neighbours_in_set_count
 
 
+class ThresholdTable(Mapping):
+    """
+    Read-only mapping of vertices to thresholds, stored as a compact integer
+    array in the order of `graph.nodes()`.
+
+    Can be used anywhere a threshold dict is accepted.
+    """
+
+    def __init__(self, graph: Graph, values: Sequence[int]):
+        if isinstance(graph, CSRGraph):
+            self._nodes: Sequence[NodeId] = graph.nodes()
+            self._index: Dict[NodeId, int] = graph.index_map()
+        else:
+            self._nodes = tuple(graph.nodes())
+            self._index = {node: idx for idx, node in enumerate(self._nodes)}
+
+        self._values = np.asarray(values, dtype=np.int32)
+        self._values.flags.writeable = False
+        self._values_list: List[int] = self._values.tolist()
+
+    def array(self) -> np.ndarray:
+        """
+        Thresholds as an array, indexed the same as `graph.nodes()`.
+        """
+        return self._values
+
+    def by_index(self, idx: int) -> int:
+        """
+        Threshold of the vertex at position `idx` in `graph.nodes()`.
+        """
+        return self._values_list[idx]
+
+    def __getitem__(self, node: NodeId) -> int:
+        return self._values_list[self._index[node]]
+
+    def __iter__(self) -> Iterator[NodeId]:
+        return iter(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
 def threshold_constraint(thresholds: Dict) -> VertexConstraint:
     """
     Check if a vertex has enough neighbours in the set.
@@ -32,11 +79,25 @@ class ThresholdAlliance(ConstrainedVertexSet):
     Validated representation of a threshold alliance.
     """
 
-    def __init__(self, graph: Graph, indices: NodeSet, thresholds: Dict):
-        super().__init__(graph, indices, threshold_constraint(thresholds))
+    def __init__(self,
+                 graph: Graph,
+                 indices: NodeSet,
+                 thresholds: Dict,
+                 validation: Validation = Validation.EAGER):
+        self._thresholds = thresholds
+        super().__init__(
+            graph, indices, threshold_constraint(thresholds), validation
+        )
+
+    def thresholds(self) -> Dict:
+        """
+        Return the thresholds the alliance satisfies.
+        """
+        return self._thresholds
 
 
 __all__ = [
     'ThresholdAlliance',
+    'ThresholdTable',
     'threshold_constraint'
 ]
@@ -0,0 +1,189 @@
+"""
+VertexSet alternative backed by the bits of a python int.
+
+Bit `i` is set when the vertex with index `i` in a CSRGraph is a member, so
+set operations are word-parallel (O(n/64)), and the hash and size are cached
+so they are O(1) after the first call.
+This makes them cheap to dedupe and store in visited tables during search and
+enumeration.
+"""
+from hashlib import blake2b
+from typing import Iterable, Iterator, Optional
+
+from .types import NodeId, NodeSet
+from .csr import CSRGraph
+from .cache import cached_csr_graph
+from .vertex_set import VertexSet
+
+
+class BitVertexSet:
+    """
+    Immutable set of vertices of a CSRGraph, stored as a bitmask.
+    """
+
+    __slots__ = ('_graph', '_bits', '_hash', '_len', '_fingerprint')
+
+    def __init__(self, graph: CSRGraph, bits: int = 0):
+        self._graph = graph
+        self._bits = bits
+        self._hash: Optional[int] = None
+        self._len: Optional[int] = None
+        self._fingerprint: Optional[int] = None
+
+    @classmethod
+    def from_indices(cls,
+                     graph: CSRGraph,
+                     indices: Iterable[int]
+                     ) -> 'BitVertexSet':
+        """
+        Build from the integer indices of vertices.
+        """
+        packed = bytearray((graph.number_of_nodes() + 7) // 8)
+        for idx in indices:
+            packed[idx >> 3] |= 1 << (idx & 7)
+        return cls(graph, int.from_bytes(packed, 'little'))
+
+    @classmethod
+    def from_nodes(cls,
+                   graph: CSRGraph,
+                   nodes: Iterable[NodeId]
+                   ) -> 'BitVertexSet':
+        """
+        Build from node ids.
+        """
+        index = graph.index_map()
+        return cls.from_indices(graph, (index[node] for node in nodes))
+
+    @classmethod
+    def from_vertex_set(cls, vs: VertexSet) -> 'BitVertexSet':
+        """
+        Convert a VertexSet, relabelling its graph if it isn't a CSRGraph.
+        """
+        return cls.from_nodes(cached_csr_graph(vs.graph()), vs.vertices())
+
+    def to_vertex_set(self) -> VertexSet:
+        """
+        Convert to a VertexSet over the CSRGraph.
+        """
+        return VertexSet(self._graph, self.vertices())
+
+    def graph(self) -> CSRGraph:
+        """
+        Return the graph.
+        """
+        return self._graph
+
+    def bits(self) -> int:
+        """
+        Return the raw bitmask.
+        """
+        return self._bits
+
+    def indices(self) -> Iterator[int]:
+        """
+        Iterate over the indices of the members, in increasing order.
+        """
+        bits = self._bits
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def vertices(self) -> NodeSet:
+        """
+        Return the members as node ids.
+        """
+        node = self._graph.node
+        return {node(idx) for idx in self.indices()}
+
+    def with_index(self, idx: int) -> 'BitVertexSet':
+        """
+        Return a copy with the vertex at `idx` added.
+        """
+        return BitVertexSet(self._graph, self._bits | (1 << idx))
+
+    def without_index(self, idx: int) -> 'BitVertexSet':
+        """
+        Return a copy with the vertex at `idx` removed.
+        """
+        return BitVertexSet(self._graph, self._bits & ~(1 << idx))
+
+    def has_index(self, idx: int) -> bool:
+        """
+        Check if the vertex at `idx` is a member.
+        """
+        return (self._bits >> idx) & 1 == 1
+
+    def fingerprint(self) -> int:
+        """
+        64-bit digest of the members, stable across processes.
+        Used as a compact key where storing the set itself costs too much.
+        """
+        if self._fingerprint is None:
+            digest = blake2b(
+                self._bits.to_bytes((self._bits.bit_length() + 7) // 8,
+                                    'little'),
+                digest_size=8
+            ).digest()
+            self._fingerprint = int.from_bytes(digest, 'little')
+        return self._fingerprint
+
+    def _check(self, other: 'BitVertexSet') -> None:
+        if other._graph is not self._graph:
+            raise ValueError('BitVertexSets are over different graphs')
+
+    def __or__(self, other: 'BitVertexSet') -> 'BitVertexSet':
+        self._check(other)
+        return BitVertexSet(self._graph, self._bits | other._bits)
+
+    def __and__(self, other: 'BitVertexSet') -> 'BitVertexSet':
+        self._check(other)
+        return BitVertexSet(self._graph, self._bits & other._bits)
+
+    def __sub__(self, other: 'BitVertexSet') -> 'BitVertexSet':
+        self._check(other)
+        return BitVertexSet(self._graph, self._bits & ~other._bits)
+
+    def __xor__(self, other: 'BitVertexSet') -> 'BitVertexSet':
+        self._check(other)
+        return BitVertexSet(self._graph, self._bits ^ other._bits)
+
+    def __le__(self, other: 'BitVertexSet') -> bool:
+        self._check(other)
+        return self._bits & ~other._bits == 0
+
+    def __lt__(self, other: 'BitVertexSet') -> bool:
+        return self <= other and self._bits != other._bits
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BitVertexSet):
+            return NotImplemented
+        return self._graph is other._graph and self._bits == other._bits
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self._bits)
+        return self._hash
+
+    def __contains__(self, node: NodeId) -> bool:
+        return node in self._graph and self.has_index(self._graph.index(node))
+
+    def __iter__(self) -> Iterator[NodeId]:
+        node = self._graph.node
+        return (node(idx) for idx in self.indices())
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = self._bits.bit_count()
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._bits != 0
+
+    def __str__(self) -> str:
+        return type(self).__name__ + str(self.vertices())
+
+
+__all__ = [
+    'BitVertexSet'
+]
@@ -0,0 +1,67 @@
+"""
+Per-graph storage for values derived from a graph, such as threshold tables.
+
+Entries are dropped when the graph is mutated:
+* A CSRGraph is frozen, so its cache lives for as long as it does.
+* NetworkX clears `__networkx_cache__` on every mutation, so we store our
+  entries in there. This needs NetworkX 3.3 or newer, which we require.
+* Any other graph, without `__networkx_cache__`, gives no way to tell it was
+  mutated, so nothing is cached for it, and each call gets an empty dict.
+"""
+from typing import Dict
+
+from .types import Graph
+from .csr import CSRGraph
+
+CACHE_KEY = 'alliancelib'
+
+
+def graph_cache(graph: Graph) -> Dict:
+    """
+    Return a dict to cache derived values of `graph` in.
+
+    For graphs without `__networkx_cache__`, this is a new dict each time, as
+    anything kept would go stale once the graph was mutated.
+    """
+    if isinstance(graph, CSRGraph):
+        return graph.cache
+
+    nx_cache = getattr(graph, '__networkx_cache__', None)
+    if nx_cache is not None:
+        return nx_cache.setdefault(CACHE_KEY, {})
+
+    return {}
+
+
+def cached_csr_graph(graph: Graph) -> CSRGraph:
+    """
+    Return `graph` as a CSRGraph, converting it at most once per graph
+    version.
+    """
+    if isinstance(graph, CSRGraph):
+        return graph
+
+    cache = graph_cache(graph)
+    if 'csr' not in cache:
+        cache['csr'] = CSRGraph.from_networkx(graph)
+    return cache['csr']
+
+
+def clear_graph_cache(graph: Graph) -> None:
+    """
+    Drop everything cached for `graph`.
+    """
+    if isinstance(graph, CSRGraph):
+        graph.cache.clear()
+        return
+
+    nx_cache = getattr(graph, '__networkx_cache__', None)
+    if nx_cache is not None:
+        nx_cache.pop(CACHE_KEY, None)
+
+
+__all__ = [
+    'graph_cache',
+    'cached_csr_graph',
+    'clear_graph_cache'
+]
@@ -0,0 +1,222 @@
+"""
+Compressed Sparse Row (CSR) representation of a graph.
+
+Nodes are relabelled to the integers `0..n-1`, in the order NetworkX yields
+them, and the neighbours of the node with index `i` are
+`targets[offsets[i]:offsets[i + 1]]`, sorted.
+
+A CSRGraph is frozen once built, so it can be shared freely and anything
+derived from it can be cached on it.
+It implements the read-only subset of the NetworkX Graph interface that the
+rest of the library uses, so it can be passed anywhere a Graph is expected.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .types import Graph, NodeId, NodeSet
+
+
+class CSRGraph:
+    """
+    Frozen, integer relabelled graph stored as offsets and targets arrays.
+    """
+
+    def __init__(self,
+                 nodes: Sequence[NodeId],
+                 offsets: np.ndarray,
+                 targets: np.ndarray):
+        if len(offsets) != len(nodes) + 1:
+            raise ValueError('offsets must have one more entry than nodes')
+
+        self._nodes: Tuple[NodeId, ...] = tuple(nodes)
+        self._index: Dict[NodeId, int] = {
+            node: idx for idx, node in enumerate(self._nodes)
+        }
+
+        self._offsets = offsets
+        self._targets = targets
+        self._offsets.flags.writeable = False
+        self._targets.flags.writeable = False
+
+        # Python lists are a lot quicker than numpy arrays for element access
+        # from pure python code, which is what the hot loops are.
+        self._offsets_list: List[int] = offsets.tolist()
+        self._targets_list: List[int] = targets.tolist()
+
+        # Anything derived from the graph (thresholds, etc) can live here, as
+        # the graph can never change.
+        self.cache: Dict = {}
+
+    @classmethod
+    def from_networkx(cls, graph: Graph) -> 'CSRGraph':
+        """
+        Build a CSRGraph from a NetworkX graph.
+        """
+        if isinstance(graph, CSRGraph):
+            return graph
+
+        nodes = list(graph.nodes())
+        index = {node: idx for idx, node in enumerate(nodes)}
+
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        targets: List[int] = []
+        for idx, node in enumerate(nodes):
+            targets.extend(sorted(index[n] for n in graph.neighbors(node)))
+            offsets[idx + 1] = len(targets)
+
+        return cls(nodes, offsets, np.array(targets, dtype=np.int64))
+
+    def __reduce__(self):
+        return (CSRGraph, (self._nodes, self._offsets, self._targets))
+
+    # Index based interface.
+
+    def offsets(self) -> np.ndarray:
+        """
+        Return the offsets array.
+        """
+        return self._offsets
+
+    def targets(self) -> np.ndarray:
+        """
+        Return the targets array.
+        """
+        return self._targets
+
+    def index(self, node: NodeId) -> int:
+        """
+        Return the integer index of a node.
+        """
+        return self._index[node]
+
+    def index_map(self) -> Dict[NodeId, int]:
+        """
+        Return the mapping of nodes to their integer indices.
+        """
+        return self._index
+
+    def indices(self, nodes: NodeSet) -> List[int]:
+        """
+        Return the integer indices of a collection of nodes.
+        """
+        return [self._index[node] for node in nodes]
+
+    def node(self, idx: int) -> NodeId:
+        """
+        Return the node with the integer index `idx`.
+        """
+        return self._nodes[idx]
+
+    def neighbourhood(self, idx: int) -> List[int]:
+        """
+        Return the indices of the neighbours of the node with index `idx`.
+        """
+        return self._targets_list[
+            self._offsets_list[idx]:self._offsets_list[idx + 1]
+        ]
+
+    def index_degree(self, idx: int) -> int:
+        """
+        Return the number of neighbours of the node with index `idx`.
+        """
+        return self._offsets_list[idx + 1] - self._offsets_list[idx]
+
+    def count_in(self, idx: int, members) -> int:
+        """
+        Number of neighbours of `idx` in `members`, a container of indices.
+        """
+        return sum(
+            1 for n in self.neighbourhood(idx) if n != idx and n in members
+        )
+
+    # NetworkX compatible interface.
+
+    def nodes(self) -> Tuple[NodeId, ...]:
+        """
+        Return the nodes, in index order.
+        """
+        return self._nodes
+
+    def neighbors(self, node: NodeId) -> Iterator[NodeId]:
+        """
+        Iterate over the neighbours of a node.
+        """
+        nodes = self._nodes
+        return (nodes[n] for n in self.neighbourhood(self._index[node]))
+
+    def has_edge(self, u: NodeId, v: NodeId) -> bool:
+        """
+        Check if an edge exists, in O(log(deg(u))).
+        """
+        if u not in self._index or v not in self._index:
+            return False
+        u_idx = self._index[u]
+        v_idx = self._index[v]
+        lo = self._offsets_list[u_idx]
+        hi = self._offsets_list[u_idx + 1]
+        pos = bisect_left(self._targets_list, v_idx, lo, hi)
+        return pos < hi and self._targets_list[pos] == v_idx
+
+    def degree(self, node: NodeId) -> int:
+        """
+        Number of neighbours of a node.
+        """
+        return self.index_degree(self._index[node])
+
+    def edges(self) -> Iterator[Tuple[NodeId, NodeId]]:
+        """
+        Iterate over each edge once.
+        """
+        nodes = self._nodes
+        for u_idx in range(len(nodes)):
+            for v_idx in self.neighbourhood(u_idx):
+                if u_idx <= v_idx:
+                    yield (nodes[u_idx], nodes[v_idx])
+
+    def number_of_nodes(self) -> int:
+        """
+        Number of nodes in the graph.
+        """
+        return len(self._nodes)
+
+    def number_of_edges(self) -> int:
+        """
+        Number of edges in the graph.
+        """
+        return sum(1 for _ in self.edges())
+
+    def to_networkx(self) -> Graph:
+        """
+        Convert back into a NetworkX graph.
+        """
+        graph = Graph()
+        graph.add_nodes_from(self._nodes)
+        graph.add_edges_from(self.edges())
+        return graph
+
+    def __getitem__(self, node: NodeId) -> Tuple[NodeId, ...]:
+        return tuple(self.neighbors(node))
+
+    def __contains__(self, node: NodeId) -> bool:
+        return node in self._index
+
+    def __iter__(self) -> Iterator[NodeId]:
+        return iter(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
+def csr_graph(graph: Graph) -> CSRGraph:
+    """
+    Return `graph` as a CSRGraph, converting it if needed.
+    """
+    return CSRGraph.from_networkx(graph)
+
+
+__all__ = [
+    'CSRGraph',
+    'csr_graph'
+]
@@ -0,0 +1,195 @@
+# pylint: disable=C0103
+"""
+Publishing graphs to worker processes through shared memory.
+
+`publish_graph` copies the CSR arrays of a graph, and its node labels, into
+`multiprocessing.shared_memory` blocks once.
+The SharedGraphHandle it gives out is just the names and sizes of those blocks,
+so it is a few bytes to send with each task, and `attach_graph` maps the
+arrays in a worker without copying them.
+
+Each process keeps the graphs it attached to, so a worker that is given many
+tasks on the same graph only attaches once.
+Attached graphs keep their blocks mapped for as long as they are alive, and the
+blocks are freed once the owner calls `close()` and every worker has let go.
+"""
+import pickle
+import sys
+from collections import OrderedDict
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple
+
+import numpy as np
+
+from .csr import CSRGraph
+from .types import Graph
+
+# number of graphs each process keeps attached.
+ATTACHED_GRAPHS = 8
+
+_attached: OrderedDict = OrderedDict()
+
+
+class SharedGraphHandle:
+    """
+    Names and sizes of the shared memory blocks holding a published graph.
+    """
+
+    def __init__(self, nodes: Tuple[str, int], offsets: Tuple[str, int],
+                 targets: Tuple[str, int]):
+        self.nodes = nodes
+        self.offsets = offsets
+        self.targets = targets
+
+    def key(self) -> str:
+        """
+        Return a name that identifies the graph.
+        """
+        return self.offsets[0]
+
+    def attach(self) -> CSRGraph:
+        """
+        Return the graph this handle points at.
+        """
+        return attach_graph(self)
+
+    def __repr__(self) -> str:
+        return f'SharedGraphHandle({self.key()})'
+
+
+class SharedGraph:
+    """
+    Owner of a graph published to shared memory.
+
+    Can be used as a context manager, which closes it on exit.
+    """
+
+    def __init__(self, graph: Graph):
+        self._graph = CSRGraph.from_networkx(graph)
+        self._blocks: List[SharedMemory] = []
+
+        try:
+            nodes = self._copy(pickle.dumps(self._graph.nodes()))
+            offsets = self._copy(self._graph.offsets())
+            targets = self._copy(self._graph.targets())
+        except BaseException:
+            self.close()
+            raise
+
+        self._handle = SharedGraphHandle(nodes, offsets, targets)
+
+    def _copy(self, data) -> Tuple[str, int]:
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data, dtype=np.int64).tobytes()
+        # blocks can't be empty.
+        block = SharedMemory(create=True, size=max(1, len(data)))
+        self._blocks.append(block)
+        block.buf[:len(data)] = data
+        return (block.name, len(data))
+
+    def handle(self) -> SharedGraphHandle:
+        """
+        Return the handle to send to workers.
+        """
+        return self._handle
+
+    def graph(self) -> CSRGraph:
+        """
+        Return the published graph, in this process.
+        """
+        return self._graph
+
+    def close(self) -> None:
+        """
+        Remove the blocks.
+        Workers that are still attached can keep using them until they let
+        go.
+        """
+        while self._blocks:
+            block = self._blocks.pop()
+            block.close()
+            block.unlink()
+
+    def __enter__(self) -> 'SharedGraph':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def publish_graph(graph: Graph) -> SharedGraph:
+    """
+    Copy a graph into shared memory, so workers can attach to it.
+    """
+    return SharedGraph(graph)
+
+
+def _open(name: str) -> SharedMemory:
+    """
+    Attach to a block without registering it with this process's resource
+    tracker, which would otherwise unlink it when the worker exits.
+    """
+    if sys.version_info >= (3, 13):
+        # pylint: disable=E1123
+        return SharedMemory(name=name, track=False)
+
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def attach_graph(handle: SharedGraphHandle) -> CSRGraph:
+    """
+    Return the graph `handle` points at, mapping its arrays without copying
+    them.
+    """
+    key = handle.key()
+    graph = _attached.get(key)
+    if graph is not None:
+        _attached.move_to_end(key)
+        return graph
+
+    block = _open(handle.nodes[0])
+    nodes = pickle.loads(bytes(block.buf[:handle.nodes[1]]))
+    block.close()
+
+    blocks = []
+    arrays = []
+    for name, size in (handle.offsets, handle.targets):
+        block = _open(name)
+        blocks.append(block)
+        arrays.append(np.ndarray(
+            (size // 8,), dtype=np.int64, buffer=block.buf
+        ))
+
+    graph = CSRGraph(nodes, arrays[0], arrays[1])
+    # the arrays are released before the cache, so the blocks can be closed
+    # once the graph is gone.
+    graph.cache['shared_memory'] = blocks
+
+    _attached[key] = graph
+    while len(_attached) > ATTACHED_GRAPHS:
+        _attached.popitem(last=False)
+    return graph
+
+
+def shared_graph(graph) -> CSRGraph:
+    """
+    Return `graph`, attaching to it first if it is a SharedGraphHandle.
+    """
+    if isinstance(graph, SharedGraphHandle):
+        return attach_graph(graph)
+    return graph
+
+
+__all__ = [
+    'SharedGraph',
+    'SharedGraphHandle',
+    'publish_graph',
+    'attach_graph',
+    'shared_graph'
+]
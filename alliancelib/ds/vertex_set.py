@@ -3,7 +3,9 @@ Various classes that represent VertexSets.
 
 These are used to build the representation of alliances.
 """
+import os
 from collections.abc import Callable
+from enum import Enum
 from .types import Graph, NodeId, NodeSet
 import networkx as nx
 
@@ -29,13 +31,13 @@ class VertexSet:
         return self._indices
 
     def __str__(self) -> str:
-        return type(self).__name__ + str(self._indices)
+        return type(self).__name__ + str(self.vertices())
 
     def __dict__(self):
-        return list(self._indices)
+        return list(self.vertices())
 
     def __len__(self):
-        return len(self._indices)
+        return len(self.vertices())
 
 
 class ConstraintException(Exception):
@@ -48,27 +50,114 @@ class ConstraintException(Exception):
 VertexConstraint = Callable[[Graph, NodeId, NodeSet], bool]
 
 
+class Validation(Enum):
+    """
+    When a ConstrainedVertexSet checks its constraint.
+
+    * EAGER - on construction.
+    * LAZY - the first time the vertices are accessed.
+    * TRUSTED - never, for sets that are already known to be valid (such as
+      the output of a solver that has already been validated).
+    """
+    EAGER = 'eager'
+    LAZY = 'lazy'
+    TRUSTED = 'trusted'
+
+
+# When set, every ConstrainedVertexSet is validated on construction, whatever
+# policy it was given. Useful for debugging runs.
+_PARANOID = os.getenv('ALLIANCELIB_PARANOID', '') not in ('', '0')
+
+
+def set_paranoid(enabled: bool) -> None:
+    """
+    Force every ConstrainedVertexSet to be validated eagerly.
+    """
+    global _PARANOID  # pylint: disable=W0603
+    _PARANOID = enabled
+
+
+def is_paranoid() -> bool:
+    """
+    Check if paranoid validation is enabled.
+    """
+    return _PARANOID
+
+
 class ConstrainedVertexSet(VertexSet):
     """
     An VertexSet that runs a function to validate it.
+
+    The result of validation is cached, so it only ever happens once.
+    Every way of reading the vertices, including `_indices`, validates the
+    set first, so checks have to use `_unchecked` instead.
     """
 
     def __init__(self,
                  graph: Graph,
                  indices: NodeSet,
-                 constraint: VertexConstraint):
+                 constraint: VertexConstraint,
+                 validation: Validation = Validation.EAGER):
         super().__init__(graph, indices)
+        self._constraint = constraint
+        self._validated = False
+
+        if _PARANOID:
+            validation = Validation.EAGER
 
+        if validation == Validation.EAGER:
+            self.validate()
+        elif validation == Validation.TRUSTED:
+            self._validated = True
+
+    @property
+    def _indices(self) -> NodeSet:
+        self.validate()
+        return self._unchecked
+
+    @_indices.setter
+    def _indices(self, indices: NodeSet) -> None:
+        self._unchecked = indices
+
+    def check(self) -> None:
+        """
+        Run the checks, raising an exception if any fail.
+        Subclasses with extra conditions extend this.
+        """
         # Check if each vertex satisifies the constraint
-        for vertex in self._indices:
-            if constraint(graph, vertex, self._indices):
+        for vertex in self._unchecked:
+            if self._constraint(self._graph, vertex, self._unchecked):
                 continue
             raise ConstraintException()
 
+    def validate(self) -> None:
+        """
+        Validate the set, if that hasn't already happened.
+        """
+        if self._validated:
+            return
+        self.check()
+        self._validated = True
+
+    def validated(self) -> bool:
+        """
+        Check if the set is known to be valid, without validating it.
+        """
+        return self._validated
+
+    def vertices(self) -> NodeSet:
+        """
+        return the vertices, validating them first if that was deferred.
+        """
+        return self._indices
+
 
 __all__ = [
     'VertexSet',
     'ConstrainedVertexSet',
     'VertexConstraint',
-    'ConstraintException'
+    'ConstraintException',
+    'Validation',
+    'set_paranoid',
+    'is_paranoid'
 ]
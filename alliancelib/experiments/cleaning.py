@@ -4,7 +4,7 @@ Graph Cleaning functions
 import random
 
 
-def min_degree_add(g, degree):
+def min_degree_add(g, degree, rng=random):
     needs_neighbours = []
     for node in g.nodes:
         if g.degree(node) < degree:
@@ -16,7 +16,7 @@ def min_degree_add(g, degree):
         needed = (degree - g.degree(node))
         if needed <= 0:
             continue
-        for choice in random.sample(list(potential_neighbours), needed):
+        for choice in rng.sample(sorted(potential_neighbours), needed):
             g.add_edge(node, choice)
 
     return g
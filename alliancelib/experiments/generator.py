@@ -1,8 +1,10 @@
 """
 Encapulate a generator for a specific graph type.
 """
+import abc
 import itertools
 import random
+from collections import OrderedDict
 import numpy as np
 import networkx as nx
 
@@ -29,22 +31,59 @@ class GraphGenerator:
         return self.__class__.__name__
 
 
-class PreGeneratedGenerator(GraphGenerator):
+class PreGeneratedGenerator(GraphGenerator, abc.ABC):
     """
     Base class for storing a bunch of graphs that are generated on
     construction.
+
+    Subclasses set `self.potential` to the list of parameters for each index,
+    and implement `generate(idx)`, which must be deterministic.
+
+    With `lazy=True` nothing is generated up front, and `at(idx)` generates
+    graphs on demand instead, keeping the `cache_size` most recently used
+    ones (0 disables caching).
+    This keeps memory use constant, and lets a worker regenerate graph `idx`
+    itself rather than being sent it.
     """
 
-    def __init__(self, generated={}):
+    def __init__(self, generated=None, lazy=False, cache_size=0):
+        self.lazy = lazy
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        if generated is None and not lazy:
+            generated = {idx: self.generate(idx) for idx in range(self.count())}
         self.generated = generated
 
         super().__init__()
 
+    @abc.abstractmethod
+    def generate(self, idx):
+        """
+        Generate a graph, and its properties for a specific index
+        """
+
     def count(self):
-        return len(self.generated)
+        if getattr(self, 'generated', None) is not None:
+            return len(self.generated)
+        return len(self.potential)
 
     def at(self, idx):
-        res = self.generated[idx]
+        if self.generated is not None:
+            return self.generated[idx]
+
+        if idx in self._cache:
+            self._cache.move_to_end(idx)
+            return self._cache[idx]
+
+        if not 0 <= idx < self.count():
+            raise IndexError
+
+        res = self.generate(idx)
+        if self.cache_size > 0:
+            self._cache[idx] = res
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
         return res
 
 
@@ -54,7 +93,7 @@ class GNPGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, n_range, p_range, split='geom', axis=10, samples=3,
-                 seed=0, min_degree=2):
+                 seed=0, min_degree=2, lazy=False, cache_size=0):
         splitter = np.linspace
         if split == 'geom':
             splitter = np.geomspace
@@ -77,9 +116,7 @@ class GNPGenerator(PreGeneratedGenerator):
         self.split = split
         self.min_degree = min_degree
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx, attempts=25):
         """
@@ -102,7 +139,7 @@ class GNPBetterGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, n_range, d_range, split='geom', axis=10, samples=3,
-                 seed=0, min_degree=2):
+                 seed=0, min_degree=2, lazy=False, cache_size=0):
         splitter = np.linspace
         if split == 'geom':
             splitter = np.geomspace
@@ -125,9 +162,7 @@ class GNPBetterGenerator(PreGeneratedGenerator):
         self.split = split
         self.min_degree = min_degree
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx, attempts=5):
         """
@@ -139,7 +174,7 @@ class GNPBetterGenerator(PreGeneratedGenerator):
         for i in range(attempts):
             seed = gen_seed([self.seed, x, y, i, s])
             g = nx.gnp_random_graph(x, p, seed)
-            g = min_degree_add(g, self.min_degree)
+            g = min_degree_add(g, self.min_degree, rng=random.Random(seed))
             if nx.is_connected(g):
                 return (res1, g)
 
@@ -152,7 +187,7 @@ class RegularGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, n_range, d_range, split='geom', axis=10, samples=3,
-                 seed=0):
+                 seed=0, lazy=False, cache_size=0):
         splitter = np.linspace
         if split == 'geom':
             splitter = np.geomspace
@@ -175,9 +210,7 @@ class RegularGenerator(PreGeneratedGenerator):
         self.seed = seed
         self.split = split
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx, attempts=5):
         """
@@ -219,7 +252,7 @@ class WaxmanGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, n_range, b_range, a_range, split='geom',
-                 axis=10, samples=3, seed=0):
+                 axis=10, samples=3, seed=0, lazy=False, cache_size=0):
         nr = range_to_list(int, n_range, split, axis)
         br = range_to_list(float, b_range, split, axis)
         ar = range_to_list(float, a_range, split, axis)
@@ -234,9 +267,7 @@ class WaxmanGenerator(PreGeneratedGenerator):
         self.seed = seed
         self.split = split
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx, attempts=25):
         """
@@ -272,7 +303,7 @@ class WaxmanDegreeGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, n_range, b_range, a_range, split='geom',
-                 axis=10, samples=3, seed=0):
+                 axis=10, samples=3, seed=0, lazy=False, cache_size=0):
         nr = range_to_list(int, n_range, split, axis)
         br = range_to_list(float, b_range, split, axis)
         ar = range_to_list(float, a_range, split, axis)
@@ -287,9 +318,7 @@ class WaxmanDegreeGenerator(PreGeneratedGenerator):
         self.seed = seed
         self.split = split
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx, attempts=5):
         """
@@ -300,12 +329,12 @@ class WaxmanDegreeGenerator(PreGeneratedGenerator):
         degree_dist = []
 
         seed = gen_seed([self.seed, n, b, a, s, 0, 0, 1])
-        random.seed(seed)
+        rng = random.Random(seed)
         df = waxman_degree_dist(n, beta=b, alpha=a, seed=seed)
         # determine the degree distribution
         while len(degree_dist) < n:
             t = 0.0
-            c = random.random()
+            c = rng.random()
             prev = 0
             for idx, row in enumerate(df):
                 t += float(row)
@@ -315,7 +344,7 @@ class WaxmanDegreeGenerator(PreGeneratedGenerator):
             degree_dist.append(prev)
 
         if sum(degree_dist) % 2 == 1:
-            degree_dist[random.randint(0, n - 1)] += 1
+            degree_dist[rng.randint(0, n - 1)] += 1
 
         for i in range(attempts):
             seed = gen_seed([self.seed, n, b, a, s, i])
@@ -336,7 +365,7 @@ class PlantedVertexCoverGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, ni_range, nx_range, pi_range, px_range, split='geom',
-                 axis=10, samples=3, seed=0):
+                 axis=10, samples=3, seed=0, lazy=False, cache_size=0):
         n_i = range_to_list(int, ni_range, split, axis)
         n_x = range_to_list(int, nx_range, split, axis)
         p_i = range_to_list(float, pi_range, split, axis)
@@ -354,9 +383,7 @@ class PlantedVertexCoverGenerator(PreGeneratedGenerator):
         self.seed = seed
         self.split = split
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx, attempts=25):
         """
@@ -380,7 +407,7 @@ class FixedGMDAGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, k_range, extra_range, split='linspace',
-                 axis=10):
+                 axis=10, lazy=False, cache_size=0):
         k_i = range_to_list(int, k_range, split, axis)
         e_i = range_to_list(int, extra_range, split, axis)
 
@@ -394,9 +421,7 @@ class FixedGMDAGenerator(PreGeneratedGenerator):
         self.axis = axis
         self.split = split
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx):
         """
@@ -414,7 +439,7 @@ class BarabasiAlbertGenerator(PreGeneratedGenerator):
     """
 
     def __init__(self, n_range, m_range, split='geom', axis=10, samples=3,
-                 seed=0):
+                 seed=0, lazy=False, cache_size=0):
         splitter = np.linspace
         if split == 'geom':
             splitter = np.geomspace
@@ -436,9 +461,7 @@ class BarabasiAlbertGenerator(PreGeneratedGenerator):
         self.seed = seed
         self.split = split
 
-        super().__init__(
-            {idx: self.generate(idx) for idx in range(len(self.potential))}
-        )
+        super().__init__(lazy=lazy, cache_size=cache_size)
 
     def generate(self, idx):
         """
@@ -446,5 +469,6 @@ class BarabasiAlbertGenerator(PreGeneratedGenerator):
         """
         n, m, s = self.potential[idx]
         res1 = {'n': n, 'm': m, 'iteration': s}
-        g = nx.barabasi_albert_graph(n, m)
+        seed = gen_seed([self.seed, n, m, s])
+        g = nx.barabasi_albert_graph(n, m, seed=seed)
         return (res1, g)
@@ -1,46 +1,81 @@
+import networkx as nx
 import pandas as pd
 from tqdm import tqdm
 import joblib
 
-from util import tqdm_joblib
+from alliancelib.ds import CSRGraph
+from alliancelib.ds.shared import publish_graph, shared_graph
+from .util import tqdm_joblib
 
+# number of graphs per worker published to shared memory at once, when
+# sharing graphs.
+SHARED_WINDOW = 4
 
-def algorithm_wrapper(name, algorithm, properties, graph):
+
+def algorithm_wrapper(name, algorithm, properties, graph, networkx=False):
+    graph = shared_graph(graph)
+    if networkx:
+        # the algorithm was given a NetworkX graph, so may use its API.
+        graph = graph.to_networkx()
     res = algorithm(graph)
     res['algorithm'] = name
     res.update(properties)
     return res
 
 
-def step(name, algorithm, generator, idx):
+def step(name, algorithm, generator, idx, published=None):
     properties, graph = generator.at(idx)
 
     if not graph:
         return joblib.delayed(lambda: None)()
 
+    # graphs go to the workers through shared memory, so only a handle is
+    # pickled for each job.
+    networkx = False
+    if published is not None and isinstance(graph, (nx.Graph, CSRGraph)):
+        networkx = not isinstance(graph, CSRGraph)
+        shared = publish_graph(graph)
+        published.append(shared)
+        graph = shared.handle()
+
     res = joblib.delayed(algorithm_wrapper)(
-        name, algorithm, properties, graph
+        name, algorithm, properties, graph, networkx
     )
 
     return res
 
 
-def experimental_setup(generator, algorithms, jobs=8):
+def experimental_setup(generator, algorithms, jobs=8, shared=False):
     """
     Run an experiment with a graph generator and a set of algorithms.
+
+    With `shared`, graphs are sent to the workers through shared memory,
+    a few at a time so the blocks are freed as their jobs finish.
+    NetworkX graphs are rebuilt from it for each job, without their
+    attributes.
     """
     graph_count = generator.count()
+    window = SHARED_WINDOW * jobs if shared else max(1, graph_count)
     results = []
     # Setup the queue for each algorithms
     for name, algorithm in algorithms.items():
         data = []
-        with tqdm_joblib(tqdm(desc=name, total=graph_count)) as _:
-            data = joblib.Parallel(n_jobs=jobs)(
-                step(
-                    name, algorithm, generator, idx
-                )
-                for idx in range(graph_count)
-            )
+        with tqdm_joblib(tqdm(desc=name, total=graph_count)) as _, \
+                joblib.Parallel(n_jobs=jobs) as parallel:
+            for start in range(0, graph_count, window):
+                published = [] if shared else None
+                try:
+                    data += parallel(
+                        step(
+                            name, algorithm, generator, idx, published
+                        )
+                        for idx in range(
+                            start, min(start + window, graph_count)
+                        )
+                    )
+                finally:
+                    for block in published or []:
+                        block.close()
         results += list(filter(lambda x: x is not None, data))
 
     return pd.DataFrame(results)
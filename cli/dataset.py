@@ -3,6 +3,7 @@ import click
 import uuid
 import json
 import os
+import multiprocessing
 
 from alliancelib.experiments.generator import \
     GNPGenerator, \
@@ -27,9 +28,22 @@ class UniqueSeed():
         return self.s
 
 
-def write_graph_with_meta(outdir, exp, idx, name, g):
+# Namespace for the file names, so they only depend on which graph it is.
+DATASET_NAMESPACE = uuid.UUID('6f1e8a4e-2c3b-4f7a-9d0e-5b8c1a2d3e4f')
+
+
+def graph_uuid(exp, idx, graph_idx):
+    """
+    Deterministic uuid for a graph, so the output is the same however the work
+    is split up.
+    """
+    return str(uuid.uuid5(DATASET_NAMESPACE, f'{exp}/{idx}/{graph_idx}'))
+
+
+def write_graph_with_meta(outdir, exp, idx, name, g, graph_idx=None):
     meta, graph = g
-    f_uuid = str(uuid.uuid4())
+    f_uuid = str(uuid.uuid4()) if graph_idx is None \
+        else graph_uuid(exp, idx, graph_idx)
     if not graph:
         print('skipped', exp, idx, name)
         return
@@ -40,6 +54,7 @@ def write_graph_with_meta(outdir, exp, idx, name, g):
         'uuid': f_uuid,
         'file': g_filename,
         'idx': idx,
+        'graph_idx': graph_idx,
         'experiment': exp,
         'generator': name,
         'meta': meta
@@ -67,7 +82,8 @@ def experiments():
                 split='linear',
                 axis=axis,
                 samples=samples,
-                seed=seed.next()
+                seed=seed.next(),
+                lazy=True
             ),
         ),
         ( # 300 graphs
@@ -78,7 +94,8 @@ def experiments():
                 split='linear',
                 axis=axis,
                 samples=samples,
-                seed=seed.next()
+                seed=seed.next(),
+                lazy=True
             )
         ),
         ( # 300 graphs
@@ -89,7 +106,8 @@ def experiments():
                 split='linear',
                 axis=axis,
                 samples=samples,
-                seed=seed.next()
+                seed=seed.next(),
+                lazy=True
             )
         ),
         ( # 75 graphs
@@ -99,7 +117,8 @@ def experiments():
                 (3, 15),
                 split='linear',
                 axis=5,
-                samples=3
+                samples=3,
+                lazy=True
             )
         ),
         ( # 75 graphs
@@ -111,7 +130,8 @@ def experiments():
                 (0.5, 0.85),
                 split='linear',
                 axis=5,
-                samples=3
+                samples=3,
+                lazy=True
             )
         ),
         ( # 100 graphs
@@ -120,7 +140,8 @@ def experiments():
                 (3, 100),
                 (0, 500),
                 split='linear',
-                axis=10
+                axis=10,
+                lazy=True
             )
         )
     ]
@@ -143,48 +164,112 @@ def selftest_experiments():
                 split='linear',
                 axis=axis,
                 samples=samples,
-                seed=seed.next()
+                seed=seed.next(),
+                lazy=True
             )
         )
     ]
 
 
-@click.command()
-@click.argument('outdir')
-def dataset_generator(outdir):
+EXPERIMENT_SETS = {
+    'dataset': experiments,
+    'selftest': selftest_experiments
+}
+
+# Generators for the current process, built on first use.
+_generators = None
+
+
+def init_worker(experiment_set):
+    """
+    Build every generator of an experiment set in this process.
+
+    All of them are built, in order, so the seeds they get match a serial run.
+    They are lazy, so this is cheap.
+    """
+    global _generators
+    _generators = [
+        (name, experiment())
+        for name, experiment in EXPERIMENT_SETS[experiment_set]()
+    ]
+
+
+def write_task(task):
+    """
+    Generate and write a single graph.
+    """
+    outdir, idx, graph_idx = task
+    name, generator = _generators[idx]
+    write_graph_with_meta(
+        outdir,
+        name,
+        idx,
+        generator.name(),
+        generator.at(graph_idx),
+        graph_idx=graph_idx
+    )
+
+
+def parse_shard(ctx, param, value):
+    """
+    Parse a shard in the form `i/M`.
+    """
+    try:
+        shard, shards = map(int, value.split('/'))
+    except ValueError:
+        raise click.BadParameter('expected i/M')
+    if shards < 1 or not 0 <= shard < shards:
+        raise click.BadParameter('need 0 <= i < M')
+    return (shard, shards)
+
+
+def generate_dataset(outdir, experiment_set, jobs, shard):
+    """
+    Write every graph from an experiment set in shard `shard` to outdir.
+
+    Graphs are assigned to shards round robin, and each shard is spread over
+    a pool of `jobs` processes. File names are derived from which graph it
+    is, so shards never collide and the output is the same for any number of
+    shards or jobs.
+    """
     os.makedirs(f'{outdir}/graphs', exist_ok=True)
     os.makedirs(f'{outdir}/meta', exist_ok=True)
 
-    for idx, (name, experiment) in enumerate(experiments()):
-        generator = experiment()
-        for i in range(generator.count()):
-            write_graph_with_meta(
-                outdir,
-                name,
-                idx,
-                generator.name(),
-                generator.at(i)
-            )
+    init_worker(experiment_set)
+    tasks = [
+        (outdir, idx, graph_idx)
+        for idx, (_, generator) in enumerate(_generators)
+        for graph_idx in range(generator.count())
+    ]
+    shard_idx, shards = shard
+    tasks = tasks[shard_idx::shards]
+
+    if jobs <= 1:
+        for task in tasks:
+            write_task(task)
+        return
+
+    with multiprocessing.Pool(
+        processes=jobs, initializer=init_worker, initargs=(experiment_set,)
+    ) as pool:
+        for _ in pool.imap_unordered(write_task, tasks):
+            pass
 
 
 @click.command()
 @click.argument('outdir')
-def selftest_generator(outdir):
-    os.makedirs(f'{outdir}/graphs', exist_ok=True)
-    os.makedirs(f'{outdir}/meta', exist_ok=True)
+@click.option('--jobs', default=1)
+@click.option('--shard', default='0/1', callback=parse_shard)
+def dataset_generator(outdir, jobs, shard):
+    generate_dataset(outdir, 'dataset', jobs, shard)
 
-    exp = selftest_experiments()
-
-    for idx, (name, experiment) in enumerate(exp):
-        generator = experiment()
-        for i in range(generator.count()):
-            write_graph_with_meta(
-                outdir,
-                name,
-                idx,
-                generator.name(),
-                generator.at(i)
-            )
+
+@click.command()
+@click.argument('outdir')
+@click.option('--jobs', default=1)
+@click.option('--shard', default='0/1', callback=parse_shard)
+def selftest_generator(outdir, jobs, shard):
+    generate_dataset(outdir, 'selftest', jobs, shard)
 
 
 @click.group()
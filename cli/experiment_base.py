@@ -19,8 +19,10 @@ from alliancelib.algorithms.heuristics.genetic import \
         defensive_alliance_genetic
 
 from alliancelib.algorithms.direct.solution_size import \
-        defensive_alliance as da_solution_size
+        defensive_alliance as da_solution_size, \
+        minimum_defensive_alliance
 
+from alliancelib.ds.shared import publish_graph, attach_graph
 from alliancelib.experiments.util import TimeoutException, timelimit
 
 
@@ -154,16 +156,18 @@ class Carrier(Exception):
 
 
 def worker(data):
-    g, k, i = data
-    res = da_solution_size(g, k, initial=[str(i)])
+    handle, k, i = data
+    res = da_solution_size(attach_graph(handle), k, initial=[str(i)])
     if res:
         raise Carrier(res.vertices())
     return None
 
 
 def solution_size_solver(g, initial, k, threads=1, time_limit=900):
+    # workers attach to the graph once, so each task is just its handle.
+    shared = publish_graph(g)
     data = zip(
-        [g for _ in range(len(initial))],
+        [shared.handle() for _ in range(len(initial))],
         [k for _ in range(len(initial))],
         initial
     )
@@ -171,7 +175,7 @@ def solution_size_solver(g, initial, k, threads=1, time_limit=900):
 
 
     start = time.time()
-    with multiprocessing.Pool(processes=threads) as pool:
+    with shared, multiprocessing.Pool(processes=threads) as pool:
         try:
             with timelimit(time_limit):
                 list(pool.imap_unordered(worker, data))
@@ -187,6 +191,27 @@ def solution_size_solver(g, initial, k, threads=1, time_limit=900):
 
     return (None, None, [])
 
+def minimum_solution_size_solver(g, k_max, time_limit=900):
+    """
+    Find a minimum alliance with the FPT solver alone, without needing the
+    optimal size from a previous ILP run.
+    """
+    res = None
+
+    start = time.time()
+    try:
+        with timelimit(time_limit):
+            res = minimum_defensive_alliance(g, k_max)
+    except TimeoutException:
+        pass
+    end = time.time()
+
+    if res:
+        return (end - start, len(res.vertices()), res.vertices())
+
+    return (None, None, [])
+
+
 def ga_da_solver(g, time_limit=900, verbose=False):
     cover = defensive_alliance_genetic(g, generations=200)
     print(cover)
@@ -13,7 +13,8 @@ from experiment_base import \
     z3_da_solver, \
     ilp_vc_solver, \
     ga_da_solver, \
-    solution_size_solver
+    solution_size_solver, \
+    minimum_solution_size_solver
 
 
 class TestCase:
@@ -257,7 +258,10 @@ def process_ga(infile, outdir, timelimit, threads, repeat, verbose):
 @click.option('--repeat', default=3)
 @click.option('--timelimit', type=float, default=900)
 @click.option('--seed', default=0)
-def process_solution_size(infile, outdir, threads, max_size, timelimit, repeat, seed):
+@click.option('--standalone', is_flag=True, default=False,
+              help='find the minimum without a previous ILP result')
+def process_solution_size(infile, outdir, threads, max_size, timelimit, repeat,
+                          seed, standalone):
     def ss_da(graph, alliance, alliance_size):
         res = solution_size_solver(
             g,
@@ -273,6 +277,19 @@ def process_solution_size(infile, outdir, threads, max_size, timelimit, repeat,
             'alliance': res[2]
         }
 
+    def ss_min_da(graph):
+        res = minimum_solution_size_solver(
+            graph,
+            max_size,
+            time_limit=timelimit
+        )
+
+        return {
+            'time': res[0],
+            'size': res[1],
+            'alliance': res[2]
+        }
+
     os.makedirs(outdir, exist_ok=True)
 
     tc = TestCase(infile)
@@ -281,6 +298,19 @@ def process_solution_size(infile, outdir, threads, max_size, timelimit, repeat,
     g_f = conf['file']
     g = nx.read_graphml(g_f)
 
+    if standalone:
+        res = []
+        for i in range(repeat):
+            res1 = ss_min_da(g)
+            print(res1)
+            res.append(res1)
+            if not res1['time']:
+                break
+
+        df = pd.DataFrame(res)
+        df.to_csv(f'{outdir}/{f_uuid}.csv')
+        return
+
     if not 'alliance' in conf:
         return
 
@@ -1,7 +1,80 @@
+import json
+import os
+import random
+import subprocess
+import sys
+from itertools import combinations
 import pytest
+import numpy as np
 import networkx as nx
-from alliancelib.ds.alliances.da import DefensiveAlliance
-from alliancelib.ds.vertex_set import ConstraintException
+from alliancelib.ds.csr import CSRGraph
+from alliancelib.ds.shared import publish_graph, attach_graph
+from alliancelib.ds.bit_vertex_set import BitVertexSet
+from alliancelib.ds.alliances.common import \
+    neighbours_in_set_count, \
+    threshold_core
+from alliancelib.ds.alliances.gmda import \
+    chisel, \
+    globally_minimal_witness
+from alliancelib.ds.alliances.lmda import locally_minimal_witness
+from alliancelib.ds.alliances.da import \
+    DefensiveAlliance, \
+    da_is_protected, \
+    defensive_alliance_threshold, \
+    defensive_alliance_thresholds, \
+    is_defensive_alliance
+from alliancelib.ds.alliances.batch import verify_defensive_alliances
+from alliancelib.ds.alliances.incremental import IncrementalAlliance
+from alliancelib.ds.alliances.conversion import convert_to_da
+from alliancelib.ds.vertex_set import \
+    ConstraintException, \
+    Validation, \
+    set_paranoid
+from alliancelib.algorithms.utils.twins import twin_classes
+from alliancelib.algorithms.heuristics.moves import MoveQueue
+from alliancelib.algorithms.heuristics.cost_functions import da_score
+from alliancelib.algorithms.heuristics.genetic import DAGenetic
+from alliancelib.algorithms.heuristics.swarm import \
+    DAMetaHeuristic, \
+    DefensiveAllianceProblem, \
+    abc_model
+from alliancelib.algorithms.heuristics.cost_reduction import \
+    defensive_alliance_reduce_cost
+from alliancelib.algorithms.heuristics.multistart import \
+    multistart_reduce_cost
+from alliancelib.algorithms.direct.minimal import \
+    find_gmda, \
+    find_gmdas, \
+    minimise_alliance
+from alliancelib.algorithms.direct import \
+    EnumerationStatistics, \
+    enumerate_gmdas
+from alliancelib.algorithms.direct.solution_size import \
+    CanonicalSearch, \
+    SearchStatistics, \
+    ParallelCanonicalSearch, \
+    defensive_alliance, \
+    defensive_alliance_parallel, \
+    minimum_defensive_alliance, \
+    iter_defensive_alliances, \
+    LocalBall, \
+    local_ball, \
+    local_defensive_alliance, \
+    local_defensive_alliances, \
+    set_fingerprint, \
+    alliance_solution_size_parallel_bfs, \
+    TranspositionTable, \
+    SharedTranspositionTable
+from alliancelib.experiments.generator import \
+    PreGeneratedGenerator, \
+    GNPGenerator, \
+    GNPBetterGenerator, \
+    RegularGenerator, \
+    WaxmanGenerator, \
+    WaxmanDegreeGenerator, \
+    PlantedVertexCoverGenerator, \
+    FixedGMDAGenerator, \
+    BarabasiAlbertGenerator
 
 
 def iterative_threshold(n, r):
@@ -38,3 +111,713 @@ def test_da_complete():
         for r in range(-3, 3):
             print(i, r)
             base_test_da_complete(i, r)
+
+
+def test_csr_matches_networkx():
+    g = nx.gnp_random_graph(60, 0.1, seed=1)
+    g.add_edge(3, 3)
+    csr = CSRGraph.from_networkx(g)
+
+    assert csr.number_of_nodes() == g.number_of_nodes()
+    assert csr.number_of_edges() == g.number_of_edges()
+    for node in g.nodes():
+        assert set(csr.neighbors(node)) == set(g.neighbors(node))
+        for other in g.nodes():
+            assert csr.has_edge(node, other) == g.has_edge(node, other)
+
+    for nodes in [set(range(0, 60, 2)), set(range(30)), {3, 4, 5}]:
+        for node in g.nodes():
+            assert neighbours_in_set_count(csr, node, nodes) == \
+                neighbours_in_set_count(g, node, list(nodes))
+        assert is_defensive_alliance(csr, nodes, -1) == \
+            is_defensive_alliance(g, nodes, -1)
+
+
+def test_threshold_table_cached_and_invalidated():
+    g = nx.gnp_random_graph(40, 0.2, seed=2)
+    for r in range(-2, 3):
+        table = defensive_alliance_thresholds(g, r)
+        assert table is defensive_alliance_thresholds(g, r)
+        for node in g.nodes():
+            assert table[node] == defensive_alliance_threshold(g, node, r)
+
+    before = defensive_alliance_thresholds(g, -1)
+    g.add_edges_from((0, i) for i in range(1, 40))
+    after = defensive_alliance_thresholds(g, -1)
+    assert after is not before
+    assert after[0] == defensive_alliance_threshold(g, 0, -1)
+
+    csr = CSRGraph.from_networkx(g)
+    assert list(defensive_alliance_thresholds(csr, -1).array()) == \
+        list(after.array())
+
+    # same node and edge counts, but a different graph.
+    for cached in (True, False):
+        g = nx.path_graph(4)
+        if not cached:
+            # as for graphs without `__networkx_cache__`.
+            del g.__networkx_cache__
+        assert defensive_alliance_thresholds(g, 0)[2] == 1
+        g.remove_edge(0, 1)
+        g.add_edge(0, 2)
+        assert defensive_alliance_thresholds(g, 0)[2] == 2
+
+
+def deficit(graph, nodes, r):
+    thresholds = defensive_alliance_thresholds(graph, r)
+    return sum(
+        max(0, thresholds[v] - neighbours_in_set_count(graph, v, nodes))
+        for v in nodes
+    )
+
+
+def test_incremental_alliance():
+    rng = random.Random(3)
+    g = nx.gnp_random_graph(30, 0.25, seed=3)
+    state = IncrementalAlliance.defensive(g, -1)
+    marks = []
+    for _ in range(300):
+        vertex = rng.randrange(30)
+        if rng.random() < 0.1:
+            marks.append((state.snapshot(), state.vertices()))
+        if vertex in state:
+            expected = state.deficit() + state.remove_delta(vertex)
+            state.remove(vertex)
+        else:
+            expected = state.deficit() + state.add_delta(vertex)
+            with_vertex = state.vertices() | {vertex}
+            assert state.is_alliance_with(vertex) == \
+                is_defensive_alliance(g, with_vertex, -1)
+            state.add(vertex)
+        nodes = state.vertices()
+        assert state.deficit() == expected == deficit(g, nodes, -1)
+        assert state.is_alliance() == is_defensive_alliance(g, nodes, -1)
+
+    for mark, nodes in reversed(marks):
+        state.undo(mark)
+        assert state.vertices() == nodes
+        assert state.deficit() == deficit(g, nodes, -1)
+
+
+def test_move_queue():
+    rng = random.Random(5)
+    g = nx.gnp_random_graph(40, 0.15, seed=5)
+    moves = MoveQueue(g, defensive_alliance_thresholds(g, 0))
+    for _ in range(200):
+        moves.move(rng.randrange(40))
+        nodes = moves.vertices()
+        assert moves.score() == deficit(g, nodes, 0)
+        for vertex in g.nodes():
+            assert moves.score() + moves.delta(vertex) == \
+                deficit(g, nodes ^ {vertex}, 0)
+        for adding in (True, False):
+            best = moves.best(adding)
+            if best is not None:
+                assert (best[1] in nodes) != adding
+                assert best[0] == min(
+                    moves.delta(v) for v in g.nodes()
+                    if (v in nodes) != adding
+                )
+
+    random.seed(0)
+    g = nx.gnp_random_graph(300, 0.02, seed=0)
+    res = defensive_alliance_reduce_cost(g, -1, steps=256)
+    assert res is not None
+    assert is_defensive_alliance(g, res.vertices(), -1)
+
+
+def test_multistart_reduce_cost():
+    g = nx.gnp_random_graph(200, 0.05, seed=2)
+    first = multistart_reduce_cost(g, 0, restarts=4, steps=256, seed=1)
+    again = multistart_reduce_cost(g, 0, restarts=4, steps=256, seed=1)
+    assert first is not None
+    assert first.vertices() == again.vertices()
+    assert is_defensive_alliance(g, first.vertices(), 0)
+
+    res = multistart_reduce_cost(
+        g, 0, restarts=4, workers=2, steps=256, seed=1
+    )
+    assert res is not None
+    assert is_defensive_alliance(g, res.vertices(), 0)
+
+    # stops as soon as any alliance is found.
+    res = multistart_reduce_cost(
+        g, 0, restarts=64, steps=10 ** 6, seed=1, target=len(g)
+    )
+    assert res is not None
+
+    # string labels hash differently each run, which mustn't change ties.
+    script = (
+        'import networkx as nx\n'
+        'from alliancelib.algorithms.heuristics.multistart import '
+        'multistart_reduce_cost\n'
+        'g = nx.random_regular_graph(5, 300, seed=1)\n'
+        'g = nx.relabel_nodes(g, {v: f"v{v}" for v in g.nodes()})\n'
+        'res = multistart_reduce_cost(g, restarts=6, seed=7)\n'
+        'print(sorted(res.vertices()))\n'
+    )
+    outputs = set()
+    for hash_seed in ('1', '2', '3'):
+        # -c puts the working directory on the path, so run from the root.
+        outputs.add(subprocess.run(
+            [sys.executable, '-c', script],
+            env=dict(os.environ, PYTHONHASHSEED=hash_seed),
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True, capture_output=True, text=True
+        ).stdout)
+    assert len(outputs) == 1
+
+
+def test_threshold_core_matches_chisel():
+    for seed in range(5):
+        g = nx.gnp_random_graph(40, 0.15, seed=seed)
+        thresholds = defensive_alliance_thresholds(g, 0)
+        nodes = set(random.Random(seed).sample(range(40), 25))
+
+        def protected(graph, node, ns):
+            return da_is_protected(graph, node, ns, 0)
+
+        core = threshold_core(g, thresholds, nodes)
+        assert core == chisel(g, protected, nodes)
+        if core:
+            DefensiveAlliance(g, core, r=0)
+
+
+def brute_force_witnesses(graph, nodes, r):
+    local = any(
+        is_defensive_alliance(graph, set(subset), r)
+        for subset in combinations(nodes, len(nodes) - 1)
+    )
+    globally = any(
+        is_defensive_alliance(graph, set(subset), r)
+        for size in range(1, len(nodes))
+        for subset in combinations(nodes, size)
+    )
+    return local, globally
+
+
+def test_minimality_witnesses():
+    rng = random.Random(4)
+    for seed in range(30):
+        g = nx.gnp_random_graph(12, 0.4, seed=seed)
+        thresholds = defensive_alliance_thresholds(g, -1)
+        nodes = set(rng.sample(range(12), rng.randint(1, 8)))
+        local, globally = brute_force_witnesses(g, nodes, -1)
+
+        witness = locally_minimal_witness(g, thresholds, nodes)
+        assert (witness is not None) == local
+        if witness is not None:
+            assert len(witness) == len(nodes) - 1
+            assert is_defensive_alliance(g, witness, -1)
+
+        witness = globally_minimal_witness(g, thresholds, nodes)
+        assert (witness is not None) == globally
+        if witness is not None:
+            assert witness < nodes
+            assert is_defensive_alliance(g, witness, -1)
+
+
+def test_batch_verification():
+    g = nx.gnp_random_graph(50, 0.1, seed=5)
+    g.add_edge(2, 2)
+    membership = np.random.RandomState(0).randint(0, 2, (100, 50))
+    membership[0] = 0
+    valid, deficits = verify_defensive_alliances(g, membership, -1)
+    for row, is_valid, row_deficit in zip(membership, valid, deficits):
+        nodes = {node for node, bit in zip(g.nodes(), row) if bit}
+        assert is_valid == is_defensive_alliance(g, nodes, -1)
+        assert row_deficit == deficit(g, nodes, -1)
+
+
+def test_batch_scoring_with_labels():
+    # string labels, not in sorted order, so positions aren't node ids.
+    g = nx.relabel_nodes(
+        nx.gnp_random_graph(30, 0.2, seed=4), lambda v: f'v{(v * 7) % 30}'
+    )
+    nodes = list(g.nodes())
+    membership = np.random.RandomState(1).randint(0, 2, (40, 30))
+    for r in (-1, 0):
+        expected = [
+            da_score(g, {nodes[i] for i in np.flatnonzero(row)}, r)
+            for row in membership
+        ]
+
+        genetic = DAGenetic(g, r)
+        fits = genetic.evaluate_population(membership.tolist())
+        assert [score for score, _ in fits] == expected
+        assert fits == [
+            genetic.toolbox.evaluate(row) for row in membership.tolist()
+        ]
+
+        problem = DefensiveAllianceProblem(g, r=r, obj_weights=[1.0, 0.1])
+        fits = problem.fit_population(membership)
+        assert [score for score, _ in fits] == expected
+        assert [size for _, size in fits] == \
+            (membership.sum(axis=1) / 30).tolist()
+
+        res = DAMetaHeuristic(abc_model(pop_size=10)).run(
+            g, generations=3, r=r, time_limit=5
+        )
+        if res is not None:
+            assert is_defensive_alliance(g, res.vertices(), r)
+
+
+def test_bit_vertex_set():
+    g = CSRGraph.from_networkx(nx.relabel_nodes(
+        nx.cycle_graph(130), lambda x: f'v{x}'
+    ))
+    a = BitVertexSet.from_nodes(g, {'v0', 'v64', 'v129'})
+    b = BitVertexSet.from_nodes(g, {'v64', 'v65'})
+
+    assert len(a) == 3 and 'v129' in a and 'v1' not in a
+    assert (a | b).vertices() == {'v0', 'v64', 'v65', 'v129'}
+    assert (a & b).vertices() == {'v64'}
+    assert (a - b).vertices() == {'v0', 'v129'}
+    assert a == BitVertexSet.from_vertex_set(a.to_vertex_set())
+    assert len({a, b, a.with_index(0)}) == 2
+    assert a.fingerprint() != b.fingerprint()
+    assert (a & b) < a
+
+
+def test_validation_policies():
+    g = nx.star_graph(3)
+    bad = {0}
+
+    for read in (lambda s: s.vertices(), len, str, lambda s: s.__dict__(),
+                 lambda s: s._indices):
+        lazy = DefensiveAlliance(g, bad, validation=Validation.LAZY)
+        assert not lazy.validated()
+        with pytest.raises(ConstraintException):
+            read(lazy)
+
+    lazy = DefensiveAlliance(g, {0, 1}, validation=Validation.LAZY)
+    assert len(lazy) == 2 and lazy.validated()
+
+    trusted = DefensiveAlliance(g, bad, validation=Validation.TRUSTED)
+    assert trusted.validated() and trusted.vertices() == bad
+
+    good = DefensiveAlliance(g, {0, 1})
+    assert convert_to_da(good).validated()
+
+    set_paranoid(True)
+    try:
+        with pytest.raises(ConstraintException):
+            DefensiveAlliance(g, bad, validation=Validation.TRUSTED)
+    finally:
+        set_paranoid(False)
+
+
+def test_canonical_search_visits_each_set_once():
+    for seed in range(10):
+        g = nx.gnp_random_graph(9, 0.4, seed=seed)
+        k = 4
+        search = CanonicalSearch(g, lambda *_: True, lambda *_: False, k)
+        assert search.search() is None
+        connected = sum(
+            1 for size in range(1, k + 1)
+            for nodes in combinations(g.nodes(), size)
+            if nx.is_connected(g.subgraph(nodes))
+        )
+        assert search.stats.visited == connected
+
+        for r in (-1, 0, 1):
+            exists = any(
+                is_defensive_alliance(g, set(nodes), r)
+                and nx.is_connected(g.subgraph(nodes))
+                for size in range(1, k + 1)
+                for nodes in combinations(g.nodes(), size)
+            )
+            stats = SearchStatistics()
+            res = defensive_alliance(g, k, r, stats=stats)
+            assert (res is not None) == exists
+            if res:
+                assert is_defensive_alliance(g, res.vertices(), r)
+
+    # the centre of a star with 6 leaves needs 3 of them for r=0, so with
+    # k=3 the bound always cuts off {centre}, which has 2 vertices left.
+    g = nx.star_graph(6)
+    stats = SearchStatistics()
+    assert defensive_alliance(g, 3, 0, stats=stats) is None
+    assert stats.pruned > 0
+    unpruned = SearchStatistics()
+    assert defensive_alliance(
+        g, 3, 0, bound=lambda *_: True, stats=unpruned
+    ) is None
+    assert unpruned.pruned == 0 and unpruned.visited > stats.visited
+
+
+def test_minimum_defensive_alliance():
+    for seed in range(10):
+        g = nx.gnp_random_graph(10, 0.3, seed=seed)
+        for r in (-1, 0, 1):
+            smallest = next((
+                size for size in range(1, 7)
+                for nodes in combinations(g.nodes(), size)
+                if is_defensive_alliance(g, set(nodes), r)
+            ), None)
+            res = minimum_defensive_alliance(g, 6, r)
+            if smallest is None:
+                assert res is None
+            else:
+                assert len(res.vertices()) == smallest
+
+
+def test_iter_defensive_alliances():
+    for seed in range(6):
+        g = nx.gnp_random_graph(9, 0.4, seed=seed)
+        for r in (-1, 0):
+            alliances = {
+                frozenset(nodes) for size in range(1, 5)
+                for nodes in combinations(g.nodes(), size)
+                if is_defensive_alliance(g, set(nodes), r)
+                and nx.is_connected(g.subgraph(nodes))
+            }
+            minimal = {
+                nodes for nodes in alliances
+                if not any(other < nodes for other in alliances)
+            }
+
+            found = [
+                frozenset(res.vertices())
+                for res in iter_defensive_alliances(g, 4, r)
+            ]
+            assert len(found) == len(set(found))
+            assert set(found) == alliances
+            assert {
+                frozenset(res.vertices())
+                for res in iter_defensive_alliances(g, 4, r, minimal=True)
+            } == minimal
+
+            assert len(list(iter_defensive_alliances(g, 4, r, limit=2))) == \
+                min(2, len(alliances))
+            assert not list(
+                iter_defensive_alliances(g, 4, r, cancelled=lambda: True)
+            )
+
+
+def test_local_defensive_alliance():
+    for seed in range(5):
+        g = nx.gnp_random_graph(11, 0.35, seed=seed)
+        for r in (-1, 0):
+            batch = local_defensive_alliances(g, g.nodes(), 4, r)
+            for v in g.nodes():
+                smallest = next((
+                    size for size in range(1, 5)
+                    for nodes in combinations(g.nodes(), size)
+                    if v in nodes and is_defensive_alliance(g, set(nodes), r)
+                ), None)
+                for res in (local_defensive_alliance(g, v, 4, r), batch[v]):
+                    if smallest is None:
+                        assert res is None
+                    else:
+                        assert v in res.vertices()
+                        assert len(res.vertices()) == smallest
+
+    # a batch caches each seed's own ball, not one around all of them.
+    g = nx.random_regular_graph(3, 200, seed=1)
+    local_defensive_alliances(g, range(0, 200, 4), 3)
+    for v in range(0, 200, 4):
+        assert len(local_ball(g, [v], 3)) == len(LocalBall(g, [v], 3))
+
+
+def test_twin_pruning():
+    assert len(set(twin_classes(nx.complete_graph(5)).values())) == 1
+    assert len(set(
+        twin_classes(nx.complete_bipartite_graph(2, 3)).values()
+    )) == 2
+
+    for seed in range(10):
+        g = nx.gnp_random_graph(9, 0.4, seed=seed)
+        for v in range(3):
+            g.add_edges_from((('twin', v), n) for n in list(g.neighbors(v)))
+        for r in (-1, 0):
+            stats = SearchStatistics()
+            res = minimum_defensive_alliance(g, 5, r, twins=True, stats=stats)
+            expected = minimum_defensive_alliance(g, 5, r)
+            assert (res is None) == (expected is None)
+            if res:
+                assert is_defensive_alliance(g, res.vertices(), r)
+                assert len(res.vertices()) == len(expected.vertices())
+
+            res = find_gmda(g, r, twins=True)
+            assert (res is None) == (find_gmda(g, r) is None)
+
+    stats = SearchStatistics()
+    res = minimum_defensive_alliance(
+        nx.complete_graph(8), 8, twins=True, stats=stats
+    )
+    assert len(res.vertices()) == 4
+    assert stats.twins > 0
+
+
+def test_find_gmdas_restarts():
+    g = nx.gnp_random_graph(60, 0.1, seed=1)
+    thresholds = defensive_alliance_thresholds(g, -1)
+    found = find_gmdas(g, restarts=6, seed=2)
+    assert len(found) == 6
+    assert len({frozenset(res.vertices()) for res in found}) == 6
+    for res in found:
+        assert globally_minimal_witness(g, thresholds, res.vertices()) is None
+
+    # every pair is a GMDA in a triangle, and then the restarts run out.
+    assert len(find_gmdas(nx.complete_graph(3), restarts=5)) == 3
+
+
+def test_enumerate_gmdas():
+    for seed in range(3):
+        g = nx.gnp_random_graph(9, 0.4, seed=seed)
+        alliances = [
+            frozenset(nodes) for size in range(1, 10)
+            for nodes in combinations(g.nodes(), size)
+            if is_defensive_alliance(g, set(nodes), -1)
+        ]
+        minimal = {
+            nodes for nodes in alliances
+            if not any(other < nodes for other in alliances)
+        }
+
+        for workers in (1, 2):
+            stats = EnumerationStatistics()
+            found = [
+                frozenset(res.vertices())
+                for res in enumerate_gmdas(g, workers=workers, stats=stats)
+            ]
+            assert len(found) == len(set(found)) == stats.found
+            assert set(found) == minimal
+
+        assert {
+            frozenset(res.vertices()) for res in enumerate_gmdas(g, max_size=2)
+        } == {nodes for nodes in minimal if len(nodes) <= 2}
+
+
+def test_minimise_alliance():
+    for seed in range(5):
+        g = nx.random_regular_graph(4, 30, seed=seed)
+        thresholds = defensive_alliance_thresholds(g, 0)
+        alliance = DefensiveAlliance(g, set(g.nodes()), 0)
+
+        res = minimise_alliance(alliance)
+        assert res.vertices() <= alliance.vertices()
+        assert globally_minimal_witness(g, thresholds, res.vertices()) is None
+
+        smaller = minimise_alliance(alliance, restarts=5, seed=seed)
+        assert len(smaller.vertices()) <= len(res.vertices())
+        assert is_defensive_alliance(g, smaller.vertices(), 0)
+
+
+def test_transposition_tables():
+    assert set_fingerprint([1, 2, 3]) == set_fingerprint([3, 1, 2])
+
+    for table in (TranspositionTable(4), SharedTranspositionTable(4, ways=4)):
+        for key in range(4):
+            table.store(set_fingerprint([key]), 3)
+        assert table.explored(set_fingerprint([0]), 2)
+        assert not table.explored(set_fingerprint([0]), 4)
+        table.store(set_fingerprint([4]), 1)
+        stats = table.stats()
+        assert stats['size'] == 4 and stats['evictions'] == 1
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        # 0 was used most recently, so survives.
+        assert table.explored(set_fingerprint([0]), 3)
+
+    # a table shared between searches for different r, in no particular
+    # order, only skips sets that failed for the same r.
+    for seed in range(4):
+        g = nx.gnp_random_graph(12, 0.5, seed=seed)
+        table = TranspositionTable(1000)
+        shared = SharedTranspositionTable(1000)
+        for r in (1, -1, 2, 0, 1, -1):
+            for k in (3, 5):
+                plain = defensive_alliance(g, k, r, canonical=False)
+                cached = defensive_alliance(
+                    g, k, r, canonical=False, table=table
+                )
+                assert (plain is None) == (cached is None)
+                bfs = defensive_alliance_parallel(
+                    g, k, r, list(g.nodes()), canonical=False, table=shared
+                )
+                assert (plain is None) == (bfs is None)
+        assert table.stats()['hits'] > 0
+
+    g = nx.gnp_random_graph(12, 0.5, seed=0)
+    for k in (3, 4):
+        plain = defensive_alliance(g, k, 3, canonical=False)
+        shared = SharedTranspositionTable(1000, workers=2)
+        bfs = defensive_alliance_parallel(
+            g, k, 3, list(g), threads=2, canonical=False, table=shared
+        )
+        assert (plain is None) == (bfs is None)
+        assert shared.stats()['misses'] > 0
+
+    # every worker needs its own statistics slot.
+    with pytest.raises(ValueError):
+        defensive_alliance_parallel(
+            g, 4, 3, list(g), threads=2, canonical=False,
+            table=SharedTranspositionTable(1000)
+        )
+
+    def failing(graph, nodes):
+        raise KeyError('failing predicate')
+
+    with pytest.raises(RuntimeError):
+        alliance_solution_size_parallel_bfs(
+            g, list(g), lambda *_: True, failing, 3, threads=2
+        )
+
+
+def test_parallel_search_matches_serial():
+    for seed in range(5):
+        g = nx.gnp_random_graph(12, 0.35, seed=seed)
+        for r in (-1, 0, 1):
+            serial = defensive_alliance(g, 5, r)
+            parallel = defensive_alliance_parallel(g, 5, r, threads=3)
+            assert (serial is None) == (parallel is None)
+            if parallel:
+                assert is_defensive_alliance(g, parallel.vertices(), r)
+
+
+def test_parallel_search_back_to_back():
+    for seed in range(40):
+        g = nx.gnp_random_graph(11, 0.35, seed=seed)
+        for r in (-1, 0, 1):
+            serial = defensive_alliance(g, 5, r)
+            parallel = defensive_alliance_parallel(g, 5, r, threads=4)
+            assert (serial is None) == (parallel is None)
+
+    def failing(graph, nodes):
+        if len(nodes) > 2:
+            raise KeyError('failing predicate')
+        return False
+
+    search = ParallelCanonicalSearch(
+        nx.complete_graph(8), lambda g, v, d: True, failing, 4, threads=3
+    )
+    with pytest.raises(KeyError):
+        search.search()
+
+
+def test_shared_graph():
+    g = nx.relabel_nodes(
+        nx.barabasi_albert_graph(40, 2, seed=3), lambda v: f'v{v}'
+    )
+    with publish_graph(g) as shared:
+        handle = shared.handle()
+        attached = attach_graph(handle)
+        assert attach_graph(handle) is attached
+        assert list(attached.nodes()) == list(g.nodes())
+        for node in g.nodes():
+            assert set(attached.neighbors(node)) == set(g.neighbors(node))
+        assert attached.targets().base is not None
+
+    with publish_graph(nx.empty_graph(0)) as shared:
+        assert len(attach_graph(shared.handle())) == 0
+
+
+def small_generators(lazy, cache_size=0):
+    return [
+        GNPGenerator(
+            (8, 12), (0.3, 0.5), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+        GNPBetterGenerator(
+            (8, 12), (2, 3), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+        RegularGenerator(
+            (8, 12), (3, 4), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+        WaxmanGenerator(
+            (8, 12), (0.8, 0.9), (0.5, 0.5), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+        WaxmanDegreeGenerator(
+            (10, 12), (0.8, 0.9), (0.5, 0.5), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+        PlantedVertexCoverGenerator(
+            (4, 5), (6, 8), (0.5, 0.5), (0.4, 0.6), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+        FixedGMDAGenerator(
+            (3, 4), (1, 2), axis=2, lazy=lazy, cache_size=cache_size
+        ),
+        BarabasiAlbertGenerator(
+            (10, 14), (1, 2), axis=2, samples=2,
+            lazy=lazy, cache_size=cache_size
+        ),
+    ]
+
+
+def generated(res):
+    meta, graph = res
+    if graph is None:
+        return (meta, None)
+    edges = sorted(tuple(sorted(edge)) for edge in graph.edges())
+    return (meta, sorted(graph.nodes()), edges)
+
+
+def test_lazy_generators():
+    with pytest.raises(TypeError):
+        PreGeneratedGenerator()
+
+    eager = small_generators(False)
+    lazy = small_generators(True, cache_size=2)
+    for pos, (gen, lazy_gen) in enumerate(zip(eager, lazy)):
+        count = gen.count()
+        assert lazy_gen.count() == count
+        assert lazy_gen.generated is None
+
+        # out of order and repeated, so graphs come from the cache and from
+        # being generated again.
+        order = list(range(count))
+        random.Random(count).shuffle(order)
+        for idx in order + order[::-1]:
+            expected = generated(gen.at(idx))
+            assert generated(lazy_gen.at(idx)) == expected
+            assert len(lazy_gen._cache) <= 2
+            fresh = small_generators(True)[pos]
+            assert generated(fresh.at(idx)) == expected
+
+        assert lazy_gen.at(order[-1]) is lazy_gen.at(order[-1])
+        with pytest.raises(IndexError):
+            lazy_gen.at(count)
+
+
+def read_dataset(outdir):
+    graphs = {}
+    for name in os.listdir(outdir / 'graphs'):
+        graphs[name] = (outdir / 'graphs' / name).read_text()
+    metas = {}
+    for name in os.listdir(outdir / 'meta'):
+        meta = json.loads((outdir / 'meta' / name).read_text())
+        assert meta.pop('file') == f"{outdir}/graphs/{meta['uuid']}.graphml"
+        metas[name] = meta
+    return graphs, metas
+
+
+def test_sharded_dataset_matches_serial(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = {
+        'serial': [(1, '0/1')],
+        'parallel': [(3, '0/1')],
+        'sharded': [(1, '0/3'), (2, '1/3'), (1, '2/3')],
+    }
+    datasets = []
+    for name, shards in runs.items():
+        for jobs, shard in shards:
+            script = (
+                'from dataset import generate_dataset, parse_shard\n'
+                f'generate_dataset({str(tmp_path / name)!r}, "selftest", '
+                f'{jobs}, parse_shard(None, None, {shard!r}))\n'
+            )
+            subprocess.run(
+                [sys.executable, '-c', script],
+                env=dict(os.environ, PYTHONPATH=root),
+                cwd=os.path.join(root, 'cli'),
+                check=True, capture_output=True
+            )
+        datasets.append(read_dataset(tmp_path / name))
+
+    assert datasets[0][0]
+    assert datasets[0] == datasets[1] == datasets[2]